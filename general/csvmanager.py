@@ -3,11 +3,15 @@
 """
 Funções para manipular arquivos de texto contendo dados.
 """
+import io
+import os
 import numpy as np
 import csv
+from concurrent.futures import ProcessPoolExecutor
 
 def csv_export(file_name, *lists, titles=None, separator='\t',
-               decimal_digit='.', number_format='sci', precision=10):
+               decimal_digit='.', number_format='sci', precision=10,
+               chunk_size=100000):
     """
     Função para salvar em arquivo de texto os dados de listas ou arrays.
 
@@ -63,6 +67,12 @@ def csv_export(file_name, *lists, titles=None, separator='\t',
         precision (int, optional): Defaults to 10.
             Número de casas decimais utilizados em dados numéricos.
 
+        chunk_size (int, optional): Defaults to 100000.
+            Número de linhas formatadas e escritas por vez. Os dados numéricos
+            de cada bloco são formatados em uma única operação por coluna e
+            escritos diretamente no arquivo, de modo que a memória utilizada
+            depende do tamanho do bloco e não do tamanho total dos dados.
+
     Exemplo de uso 1 (múltiplas listas 1D fornecidas):
         Dadas as variáveis:
             I1 = [1.32, 2.65, 8.6, 0.7, 5.731]
@@ -94,10 +104,9 @@ def csv_export(file_name, *lists, titles=None, separator='\t',
 
     """
     #Checagem do tipo de entrada:
-    #n-listas: dimensions = 2
-    #lista de listas: dimensions = 3
-    dimensions = np.array(lists, dtype=object).ndim
-    if dimensions == 3:
+    #n-listas: cada elemento de "lists" é uma coluna
+    #lista de listas: um único elemento contendo as colunas
+    if _is_list_of_lists(lists):
         lists = lists[0]
 
     #Checagem dos títulos (caso fornecidos)
@@ -123,32 +132,26 @@ def csv_export(file_name, *lists, titles=None, separator='\t',
         if (len(data) != data_length):
             raise Exception('Todos os vetores de dados devem ter o mesmo tamanho!')
 
-    #Montagem da matriz de dados
-    str_format = '{:.' + str(precision)
+    #Formato dos dados numéricos
+    str_format = '%.' + str(precision)
     if (number_format == 'sci'):
-        str_format += 'e}'
+        str_format += 'e'
     elif (number_format == 'dec'):
-        str_format += 'f}'
+        str_format += 'f'
     else: #Vetores numéricos tratados como vetores genéricos
         str_format = 'generic'
 
-    data_matrix = []
-
+    #Conversão de cada coluna uma única vez: vetores numéricos viram arrays
+    #float e vetores genéricos são mantidos como estão.
+    columns = []
     for data in lists:
         try: #Vetor numérico
             if (str_format == 'generic'):
                 raise Exception()
-            data = np.array(data, dtype=float)
-            temp_data = [str_format.format(x).replace('.', decimal_digit) \
-                         for x in data]
+            columns.append((True, np.asarray(data, dtype=float)))
 
         except: #Vetor genérico
-            temp_data = [str(x) for x in data]
-
-        finally: #Finalmente mesmo.... ufa
-            data_matrix.append(temp_data)
-
-    data_matrix = np.array(data_matrix).T.tolist()
+            columns.append((False, data))
 
     #Escrita no arquivo
     #Depois de tanto malabarismo para ajustar os dados e fazer os dumb checks,
@@ -159,5 +162,242 @@ def csv_export(file_name, *lists, titles=None, separator='\t',
         if (titles != None):
             writer.writerow(titles)
 
-        for line in data_matrix:
-            writer.writerow(line)
+        #Caso todas as colunas sejam numéricas e nenhum campo precise de
+        #aspas, cada linha é formatada diretamente com o separador, sem
+        #passar pelo csv.writer (mesmo resultado, inclusive o '\r\n').
+        direct = all(numeric for numeric, _ in columns) and \
+            not (set(separator + decimal_digit) & set('"\r\n')) and \
+            not (set(separator) & set('0123456789.+-naife'))
+        row_format = separator.replace('%', '%%').join(
+            [str_format]*len(columns)) + writer.dialect.lineterminator
+
+        #Escrita em blocos de "chunk_size" linhas. Cada coluna numérica do
+        #bloco é formatada por uma única operação de string.
+        for start in range(0, data_length, chunk_size):
+            stop = min(start + chunk_size, data_length)
+            if direct:
+                block = np.column_stack([data[start:stop]
+                                         for _, data in columns])
+                text = (row_format * (stop - start)) % \
+                    tuple(block.ravel().tolist())
+                file.write(text.replace('.', decimal_digit))
+                continue
+
+            block = []
+            for numeric, data in columns:
+                if numeric:
+                    text = ((str_format + '\n') * (stop - start)) % \
+                        tuple(data[start:stop].tolist())
+                    block.append(text.replace('.', decimal_digit)
+                                 .split('\n')[:-1])
+                else:
+                    block.append([str(x) for x in data[start:stop]])
+            writer.writerows(zip(*block))
+
+def _is_list_of_lists(lists):
+    #Verifica se "lists" contém uma única lista de listas (ou 2D-array).
+    if (len(lists) != 1):
+        return False
+    data = lists[0]
+    if isinstance(data, np.ndarray):
+        return data.ndim == 2
+    try:
+        return (len(data) > 0) and (not isinstance(data[0], str)) and \
+            hasattr(data[0], '__len__')
+    except TypeError:
+        return False
+
+
+def _parse_text_column(values, decimal_digit):
+    #Converte uma coluna de strings em float em uma única operação. Caso
+    #algum valor não seja numérico (ou seja vazio), retorna None.
+    joined = ' '.join(values)
+    if (decimal_digit != '.'):
+        joined = joined.replace(decimal_digit, '.')
+    try:
+        data = np.fromstring(joined, dtype=float, sep=' ')
+    except ValueError:
+        return None
+    return data if (len(data) == len(values)) else None
+
+
+def _parse_range(file_name, start, stop, separator, decimal_digit, encoding,
+                 text_columns=()):
+    #Lê e converte as linhas cujo primeiro byte está em [start, stop).
+    #Retorna uma lista de colunas (float array ou lista de strings).
+    with open(file_name, 'rb') as file:
+        if (start > 0):
+            file.seek(start - 1)
+            #Caso o byte anterior não seja fim de linha, a linha atual
+            #pertence ao intervalo anterior.
+            if (file.read(1) != b'\n'):
+                file.readline()
+        begin = file.tell()
+        if (begin >= stop):
+            return None
+        raw = file.read(stop - begin)
+        if not raw.endswith(b'\n'):
+            raw += file.readline()
+    text = raw.decode(encoding)
+    #Linhas em branco são ignoradas; intervalos sem nenhuma linha de dados
+    #são tratados como vazios.
+    if not text.strip('\r\n'):
+        return None
+    if text.startswith(('\n', '\r\n')) or ('\n\n' in text) or \
+            ('\n\r\n' in text):
+        text = '\n'.join(line for line in text.splitlines() if line)
+
+    #Caminho rápido: todas as colunas numéricas, convertidas de uma só vez.
+    if (not text_columns) and (separator != '.'):
+        lines = text.count('\n') + (not text.endswith('\n'))
+        fast = text if (decimal_digit == '.') else \
+            text.replace(decimal_digit, '.')
+        try:
+            data = np.fromstring(fast.replace(separator, ' '), dtype=float,
+                                 sep=' ')
+        except ValueError:
+            data = None
+        if (data is not None) and (len(data) % lines == 0):
+            first_line = text[:text.find('\n')] if ('\n' in text) else text
+            columns = len(next(csv.reader([first_line],
+                                          delimiter=separator)))
+            if (len(data) == lines*columns):
+                data = data.reshape(lines, columns)
+                return [data[:, i].copy() for i in range(columns)]
+
+    rows = [row for row in csv.reader(io.StringIO(text, newline=''),
+                                      delimiter=separator) if row]
+    output = []
+    for i, values in enumerate(zip(*rows)):
+        data = None if (i in text_columns) else \
+            _parse_text_column(values, decimal_digit)
+        output.append(list(values) if (data is None) else data)
+    return output
+
+
+def csv_import(file_name, titles=True, separator='\t', decimal_digit='.',
+               structured=False, chunk_size=2**24, workers=1,
+               encoding='utf-8'):
+    """
+    Função para ler arquivos de texto com dados em colunas, como os gerados
+    por "csv_export", com as mesmas convenções de separador de colunas e de
+    separador decimal.
+
+    O arquivo é lido em blocos de "chunk_size" bytes (alinhados ao fim das
+    linhas), de modo que apenas um bloco de texto fica em memória por vez.
+    Com "workers" > 1, os blocos são convertidos em paralelo por processos
+    diferentes, cada um lendo diretamente o seu intervalo de bytes do
+    arquivo.
+
+    Colunas onde todos os valores são numéricos são retornadas como arrays
+    float, as demais como arrays de strings.
+
+    Obs.:
+        Campos entre aspas contendo quebras de linha não são suportados
+        (csv_export nunca gera este caso para dados numéricos).
+
+    Args:
+        file_name (string):
+            Nome do arquivo a ser lido.
+
+        titles (bool, optional): Defaults to True.
+            Indica se a primeira linha do arquivo contém os títulos das
+            colunas.
+
+        separator (string, optional): Defaults to TAB ('\t').
+            Caractere delimitador das colunas.
+
+        decimal_digit (string, optional): Defaults to '.'.
+            Caractere separador das casas decimais (',' para arquivos Pt-Br).
+
+        structured (bool, optional): Defaults to False.
+            Caso True, retorna um structured array com um campo por coluna,
+            nomeado pelo título da coluna (ou 'f0', 'f1', ... sem títulos).
+
+        chunk_size (int, optional): Defaults to 2**24 (16 MiB).
+            Tamanho, em bytes, de cada bloco lido do arquivo.
+
+        workers (int, optional): Defaults to 1.
+            Número de processos utilizados na conversão dos blocos.
+
+        encoding (string, optional): Defaults to 'utf-8'.
+            Codificação do arquivo.
+
+    Returns:
+        titles (string-list, somente se "titles" for True):
+            Títulos das colunas.
+
+        columns (list of 1D-arrays):
+            Dados de cada coluna.
+
+        Caso "structured" seja True, retorna apenas o structured array.
+
+    Exemplo de uso:
+        Lendo o arquivo gerado no "Exemplo de uso 2" de "csv_export":
+            titulos, (rendimento, temperatura) = csv_import(
+                'experimento.dat', separator=';', decimal_digit=',')
+    """
+    if (separator == decimal_digit):
+        raise Exception('O caractere delimitador de colunas \'separator\' '\
+                        'deve ser diferente do caractere separador decimal '\
+                        '\'decimal_digit\'!')
+
+    header = None
+    start = 0
+    if titles:
+        with open(file_name, 'rb') as file:
+            line = file.readline()
+            start = file.tell()
+        header = next(csv.reader([line.decode(encoding).rstrip('\r\n')],
+                                 delimiter=separator))
+
+    size = os.path.getsize(file_name)
+    ranges = [(begin, min(begin + chunk_size, size))
+              for begin in range(start, size, chunk_size)]
+    arguments = [(file_name, begin, end, separator, decimal_digit, encoding)
+                 for begin, end in ranges]
+
+    if (workers > 1):
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(_parse_range, *zip(*arguments)))
+    else:
+        chunks = [_parse_range(*args) for args in arguments]
+    valid = [i for i, chunk in enumerate(chunks) if chunk is not None]
+    chunks = [chunks[i] for i in valid]
+
+    n_columns = len(header) if (header is not None) else \
+        (len(chunks[0]) if chunks else 0)
+    if any(len(chunk) != n_columns for chunk in chunks):
+        raise Exception('Todas as linhas devem ter o mesmo número de colunas!')
+
+    #Colunas numéricas em alguns blocos e textuais em outros são relidas
+    #como texto nos blocos onde foram convertidas.
+    text_columns = {i for i in range(n_columns)
+                    if any(isinstance(chunk[i], list) for chunk in chunks)}
+    for i, position in enumerate(valid):
+        if any(isinstance(chunks[i][j], np.ndarray) for j in text_columns):
+            chunks[i] = _parse_range(*arguments[position],
+                                     text_columns=text_columns)
+
+    columns = []
+    for i in range(n_columns):
+        if (i in text_columns):
+            columns.append(np.array([value for chunk in chunks
+                                     for value in chunk[i]], dtype=str))
+        else:
+            columns.append(np.concatenate([chunk[i] for chunk in chunks])
+                           if chunks else np.empty(0))
+
+    if structured:
+        names = header if (header is not None) else \
+            ['f{}'.format(i) for i in range(n_columns)]
+        output = np.empty(len(columns[0]) if columns else 0,
+                          dtype=[(name, column.dtype)
+                                 for name, column in zip(names, columns)])
+        for name, column in zip(names, columns):
+            output[name] = column
+        return output
+
+    if titles:
+        return header, columns
+    return columns
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+# %%
+"""
+Arrays de intervalos em float64, alternativa vetorizada aos intervalos
+escalares "iv.mpf" do mpmath.
+
+Cada "IntervalArray" armazena dois arrays (inferior e superior) e implementa
+as operações com arredondamento para fora: após cada operação o extremo
+inferior é deslocado 1 ulp para baixo e o superior 1 ulp para cima (2 ulps
+nas potências e nas funções transcendentais), de modo que o resultado sempre contém o
+resultado exato. Os intervalos obtidos são, portanto, ligeiramente mais
+largos que os do mpmath, em troca de operar sobre milhões de intervalos por
+vez.
+
+Funções disponíveis:
+    - IntervalArray: Array de intervalos (+, -, *, /, **, abs, sin, cos, exp,
+      sqrt, sum, prod), compatível com as ufuncs do numpy correspondentes.
+    - IntervalArray.from_ivmpf / IntervalArray.to_ivmpf: Conversão de e para
+      intervalos "iv.mpf" (ver "ivmpftools").
+"""
+import numpy as np
+import mpmath as mp
+from ivmpftools import ivmpf_to_array
+
+def _down(x, ulps=1):
+    for _ in range(ulps):
+        x = np.nextafter(x, -np.inf)
+    return x
+
+def _up(x, ulps=1):
+    for _ in range(ulps):
+        x = np.nextafter(x, np.inf)
+    return x
+
+def _products(a, b):
+    #Produtos entre extremos, com 0*inf = 0 (convenção da aritmética
+    #intervalar).
+    with np.errstate(invalid='ignore'):
+        products = np.stack([a.lower*b.lower, a.lower*b.upper,
+                             a.upper*b.lower, a.upper*b.upper])
+    return np.where(np.isnan(products), 0.0, products)
+
+
+class IntervalArray:
+    """
+    Array de intervalos [lower, upper] em float64.
+
+    Args:
+        lower (array_like):
+            Extremos inferiores.
+
+        upper (array_like, optional): Defaults to None.
+            Extremos superiores. Caso não seja fornecido, os intervalos são
+            degenerados (upper = lower).
+
+    Exemplo de uso:
+        x = IntervalArray([-1, 0.5], [2, 0.75])
+        y = x**2 + np.sin(x)
+        print(y.lower, y.upper)
+    """
+    __array_priority__ = 1000
+
+    def __init__(self, lower, upper=None):
+        self.lower = np.array(lower, dtype=float)
+        self.upper = self.lower.copy() if (upper is None) else \
+            np.array(upper, dtype=float)
+        if (self.lower.shape != self.upper.shape):
+            self.lower, self.upper = np.broadcast_arrays(self.lower,
+                                                         self.upper)
+            self.lower = self.lower.copy()
+            self.upper = self.upper.copy()
+        if np.any(self.lower > self.upper):
+            raise Exception('O extremo inferior deve ser menor ou igual ao '\
+                            'superior!')
+
+    @classmethod
+    def _from_bounds(cls, lower, upper):
+        #Construtor interno, sem cópias nem verificações.
+        output = cls.__new__(cls)
+        output.lower = lower
+        output.upper = upper
+        return output
+
+    @classmethod
+    def _coerce(cls, other):
+        if isinstance(other, IntervalArray):
+            return other
+        other = np.asarray(other, dtype=float)
+        return cls._from_bounds(other, other)
+
+    #---------------------------------------
+    #Conversão de e para mpmath
+    @classmethod
+    def from_ivmpf(cls, ivmpf):
+        """
+        Cria um IntervalArray a partir de um "iv.mpf" ou lista/array
+        (possivelmente aninhado) de "iv.mpf", com arredondamento para fora.
+        """
+        bounds = ivmpf_to_array(ivmpf, dtype=float)
+        return cls._from_bounds(bounds[..., 0].copy(), bounds[..., 1].copy())
+
+    def to_ivmpf(self):
+        """
+        Converte em um array (de mesmo formato) de "iv.mpf". Os extremos em
+        float64 são representados exatamente pelo mpmath.
+        """
+        convert = np.frompyfunc(lambda a, b: mp.iv.mpf([a, b]), 2, 1)
+        output = convert(self.lower, self.upper)
+        return output if isinstance(output, np.ndarray) else \
+            np.array(output, dtype=object)
+
+    #---------------------------------------
+    #Propriedades e indexação
+    @property
+    def shape(self):
+        return self.lower.shape
+
+    @property
+    def ndim(self):
+        return self.lower.ndim
+
+    @property
+    def mid(self):
+        return self.lower/2 + self.upper/2
+
+    @property
+    def width(self):
+        return self.upper - self.lower
+
+    def __len__(self):
+        return len(self.lower)
+
+    def __getitem__(self, index):
+        return IntervalArray._from_bounds(self.lower[index], self.upper[index])
+
+    def __setitem__(self, index, value):
+        value = IntervalArray._coerce(value)
+        self.lower[index] = value.lower
+        self.upper[index] = value.upper
+
+    def __repr__(self):
+        return 'IntervalArray(lower={!r}, upper={!r})'.format(self.lower,
+                                                               self.upper)
+
+    def contains(self, x):
+        """
+        Verifica, elemento a elemento, se "x" está contido nos intervalos.
+        """
+        x = np.asarray(x, dtype=float)
+        return (self.lower <= x) & (x <= self.upper)
+
+    #---------------------------------------
+    #Aritmética
+    def __neg__(self):
+        return IntervalArray._from_bounds(-self.upper, -self.lower)
+
+    def __pos__(self):
+        return self
+
+    def __add__(self, other):
+        other = IntervalArray._coerce(other)
+        return IntervalArray._from_bounds(_down(self.lower + other.lower),
+                                          _up(self.upper + other.upper))
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        other = IntervalArray._coerce(other)
+        return IntervalArray._from_bounds(_down(self.lower - other.upper),
+                                          _up(self.upper - other.lower))
+
+    def __rsub__(self, other):
+        return IntervalArray._coerce(other) - self
+
+    def __mul__(self, other):
+        products = _products(self, IntervalArray._coerce(other))
+        return IntervalArray._from_bounds(_down(products.min(axis=0)),
+                                          _up(products.max(axis=0)))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        other = IntervalArray._coerce(other)
+        #Divisores que contêm o zero resultam na reta real inteira.
+        zero = (other.lower <= 0) & (other.upper >= 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inverse = IntervalArray._from_bounds(_down(1/other.upper),
+                                                 _up(1/other.lower))
+        products = _products(self, inverse)
+        lower = np.where(zero, -np.inf, _down(products.min(axis=0)))
+        upper = np.where(zero, np.inf, _up(products.max(axis=0)))
+        return IntervalArray._from_bounds(lower, upper)
+
+    def __rtruediv__(self, other):
+        return IntervalArray._coerce(other) / self
+
+    def __pow__(self, n):
+        if (int(n) != n):
+            raise Exception('Apenas potências inteiras são suportadas, '\
+                            'utilize sqrt/exp para os demais casos!')
+        n = int(n)
+        if (n == 0):
+            return IntervalArray._from_bounds(np.ones(self.shape),
+                                              np.ones(self.shape))
+        if (n < 0):
+            return 1 / (self**(-n))
+        a = self.lower**n
+        b = self.upper**n
+        if (n % 2):
+            return IntervalArray._from_bounds(_down(a, 2), _up(b, 2))
+        #Potência par: mínimo em zero caso o intervalo o contenha.
+        lower = np.where(self.lower >= 0, a, np.where(self.upper <= 0, b, 0))
+        upper = np.maximum(a, b)
+        return IntervalArray._from_bounds(np.maximum(_down(lower, 2), 0),
+                                          _up(upper, 2))
+
+    def __abs__(self):
+        lower = np.where(self.lower >= 0, self.lower,
+                         np.where(self.upper <= 0, -self.upper, 0))
+        upper = np.maximum(-self.lower, self.upper)
+        return IntervalArray._from_bounds(lower, upper)
+
+    #---------------------------------------
+    #Funções elementares
+    def exp(self):
+        lower = np.maximum(_down(np.exp(self.lower), 2), 0)
+        return IntervalArray._from_bounds(lower, _up(np.exp(self.upper), 2))
+
+    def sqrt(self):
+        #Domínio restrito a x >= 0. Intervalos totalmente negativos
+        #resultam em NaN.
+        with np.errstate(invalid='ignore'):
+            lower = np.sqrt(np.where(self.upper >= 0,
+                                     np.maximum(self.lower, 0), np.nan))
+            upper = np.sqrt(self.upper)
+        return IntervalArray._from_bounds(np.maximum(_down(lower, 2), 0),
+                                          _up(upper, 2))
+
+    def _periodic(self, values, maximum, minimum):
+        #Extremos de uma função periódica (período 2*pi, valores em [-1, 1])
+        #com máximo em "maximum" + 2k*pi e mínimo em "minimum" + 2k*pi.
+        period = 2*np.pi
+        #Candidatos a extremo próximos do extremo inferior. A folga cobre os
+        #erros de arredondamento: incluir um extremo a mais apenas alarga o
+        #intervalo, nunca o torna incorreto.
+        slack = 8*np.finfo(float).eps*np.maximum(1, np.abs(self.upper) +
+                                                 np.abs(self.lower))
+        def contains(point):
+            k = np.floor((self.lower - point)/period)
+            return np.any([(self.lower - slack <= (k + j)*period + point) &
+                           ((k + j)*period + point <= self.upper + slack)
+                           for j in range(3)], axis=0)
+        has_max = contains(maximum)
+        has_min = contains(minimum)
+        wide = (self.upper - self.lower) >= period
+        a = values(self.lower)
+        b = values(self.upper)
+        lower = np.where(has_min | wide, -1.0,
+                         np.maximum(_down(np.minimum(a, b), 2), -1.0))
+        upper = np.where(has_max | wide, 1.0,
+                         np.minimum(_up(np.maximum(a, b), 2), 1.0))
+        return IntervalArray._from_bounds(lower, upper)
+
+    def sin(self):
+        return self._periodic(np.sin, np.pi/2, -np.pi/2)
+
+    def cos(self):
+        return self._periodic(np.cos, 0.0, np.pi)
+
+    #---------------------------------------
+    #Reduções
+    def sum(self, axis=None, **kwargs):
+        #Soma sem arredondamento dirigido, alargada por um limite do erro
+        #acumulado: n ulps de cada soma parcial.
+        lower = np.sum(self.lower, axis=axis)
+        upper = np.sum(self.upper, axis=axis)
+        n = self.lower.size if (axis is None) else self.lower.shape[axis]
+        error_lower = np.sum(np.abs(self.lower), axis=axis) * \
+            n * np.finfo(float).eps
+        error_upper = np.sum(np.abs(self.upper), axis=axis) * \
+            n * np.finfo(float).eps
+        return IntervalArray._from_bounds(_down(lower - error_lower),
+                                          _up(upper + error_upper))
+
+    def prod(self, axis=None, **kwargs):
+        if (axis is None):
+            items = self.lower.ravel(), self.upper.ravel()
+            axis = 0
+        else:
+            items = self.lower, self.upper
+        lower = np.moveaxis(items[0], axis, 0)
+        upper = np.moveaxis(items[1], axis, 0)
+        output = IntervalArray._from_bounds(np.ones(lower.shape[1:]),
+                                            np.ones(lower.shape[1:]))
+        for a, b in zip(lower, upper):
+            output = output * IntervalArray._from_bounds(a, b)
+        return output
+
+    #---------------------------------------
+    #Compatibilidade com as ufuncs do numpy (ex.: np.sin(x), np.exp(x))
+    _UFUNCS = {np.add: '__add__', np.subtract: '__sub__',
+               np.multiply: '__mul__', np.true_divide: '__truediv__',
+               np.negative: '__neg__', np.absolute: '__abs__',
+               np.sin: 'sin', np.cos: 'cos', np.exp: 'exp', np.sqrt: 'sqrt'}
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if (method != '__call__') or kwargs:
+            return NotImplemented
+        if (ufunc is np.power):
+            base, exponent = inputs
+            if not isinstance(base, IntervalArray):
+                return NotImplemented
+            return base**exponent
+        if (ufunc not in self._UFUNCS):
+            return NotImplemented
+        first = IntervalArray._coerce(inputs[0])
+        return getattr(first, self._UFUNCS[ufunc])(*inputs[1:])
+
+
+
+if (__name__ == '__main__'):
+    #Limites da função Styblinski-Tang em 10^6 caixas de [-5, 5]
+    lower = np.random.uniform(-5, 4.9, size=(1000000, 2))
+    x = IntervalArray(lower, lower + 0.1)
+    bounds = ((x**4 - 16*x**2 + 5*x).sum(axis=1)) / 2
+    print('\nMenor limite inferior: {:0.4f}'.format(np.min(bounds.lower)))
@@ -17,6 +17,7 @@ def ivmpf_disassembler(ivmpf):
 
     Args:
         ivmpf (iv.mpf ou lista/array de iv.mpf): Intervalo/s de entrada.
+            Listas/arrays aninhados geram arrays com uma dimensão a mais.
 
     Returns:
         TYPE: Array de mp.mpf.
@@ -26,13 +27,69 @@ def ivmpf_disassembler(ivmpf):
             - 2D-array = [[<inferior_0>, <superior_0>] ... [<inferior_n>, <superior_n>]]
               caso seja fornecido [<iv.mpf>, ..., <iv.mpf>].
     """
-    try:
-        elements_count = len(ivmpf)
-        output = []
-        for i in range(elements_count):
-            output.append(ivmpf_disassembler(ivmpf[i]))
-        return np.array(output, dtype=object)
-    except:
-        ivmpf = str(ivmpf)[1:-1].replace(' ','')
-        sep_position = ivmpf.find(',')
-        return np.array([mp.mpf(ivmpf[:sep_position]), mp.mpf(ivmpf[sep_position+1:])])
+    return ivmpf_to_array(ivmpf, dtype=object)
+
+
+def ivmpf_to_array(ivmpf, dtype=object):
+    """
+    Conversão em lote de intervalos "iv.mpf" (ou "iv.mpc") em arrays,
+    lendo diretamente os extremos de cada intervalo, sem conversão para texto
+    e sem recursão, para qualquer formato de lista/array aninhado.
+
+    Args:
+        ivmpf (iv.mpf/iv.mpc ou lista/array, possivelmente aninhado):
+            Intervalo/s de entrada.
+
+        dtype (optional): Defaults to object.
+            Tipo de saída:
+                - object -> Extremos como "mp.mpf" (ou "mp.mpc"), sem perda
+                  de precisão.
+                - float -> Extremos como float64 (ou complex128) com
+                  arredondamento para fora: o inferior é arredondado para
+                  baixo e o superior para cima, de modo que o intervalo em
+                  float sempre contém o intervalo original.
+
+    Returns:
+        Array de formato (<formato da entrada>, 2):
+            [..., 0] -> Extremo inferior.
+            [..., 1] -> Extremo superior.
+            Para intervalos complexos, os extremos são os cantos inferior
+            (re_inf + j*im_inf) e superior (re_sup + j*im_sup) do retângulo.
+    """
+    intervals = np.empty((), dtype=object)
+    intervals[()] = ivmpf
+    if not isinstance(ivmpf, (mp.iv.mpf, mp.iv.mpc)):
+        intervals = np.array(ivmpf, dtype=object)
+    flat = intervals.ravel()
+    complex_data = any(isinstance(x, mp.iv.mpc) for x in flat)
+
+    #Extremos no formato interno do mpmath: (re, im) x (inferior, superior)
+    if complex_data:
+        raw = [x._mpci_ if isinstance(x, mp.iv.mpc) else
+               (x._mpi_, (mp.libmp.fzero, mp.libmp.fzero)) for x in flat]
+    else:
+        raw = [(x._mpi_,) for x in flat]
+
+    if (dtype is object):
+        output = np.empty((len(flat), 2), dtype=object)
+        if complex_data:
+            output[:] = [[mp.mpc(mp.make_mpf(re[0]), mp.make_mpf(im[0])),
+                          mp.mpc(mp.make_mpf(re[1]), mp.make_mpf(im[1]))]
+                         for re, im in raw]
+        elif raw:
+            output[:] = [[mp.make_mpf(re[0]), mp.make_mpf(re[1])]
+                         for (re,) in raw]
+    else:
+        floor = mp.libmp.round_floor
+        ceiling = mp.libmp.round_ceiling
+        to_float = mp.libmp.to_float
+        components = np.array([[to_float(part[0], rnd=floor),
+                                to_float(part[1], rnd=ceiling)]
+                               for x in raw for part in x],
+                              dtype=float).reshape(
+                                  len(flat), 2 if complex_data else 1, 2)
+        output = components[:, 0, :]
+        if complex_data:
+            output = output + 1j*components[:, 1, :]
+
+    return output.reshape(intervals.shape + (2,))
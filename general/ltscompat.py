@@ -3,9 +3,133 @@
 """
 Pacote com funções para compatibilizar os arquivos de saída do LtSpice com o Python.
 """
+import os
+import re
+import json
+import hashlib
+from functools import cached_property
 import numpy as np
 
-def step_import(file_name: str):
+#Linhas em branco ou que não começam com um número (cabeçalho e
+#"Step Information") delimitam os blocos de dados de cada "step".
+_SEPARATOR_LINE = re.compile(r'^[ \t\r]*(?:[^\s\d+\-.].*)?$', re.MULTILINE)
+_STEP_PARAMETER = re.compile(r'([^\s=()]+)=([^\s=()]+)')
+_SPICE_SUFFIX = {'f': 1e-15, 'p': 1e-12, 'n': 1e-9, 'u': 1e-6, 'µ': 1e-6,
+                 'm': 1e-3, 'k': 1e3, 'meg': 1e6, 'g': 1e9, 't': 1e12}
+
+
+def spice_number(text: str):
+    """
+    Converte um número no formato do SPICE (ex.: '4.7k', '10n', '1Meg') em
+    float. Caso a conversão não seja possível, retorna o próprio texto.
+    """
+    match = re.match(r'^([+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)'
+                     r'(meg|[fpnuµmkgt])?', text.strip(), re.IGNORECASE)
+    if (match is None):
+        return text
+    value = float(match.group(1))
+    if match.group(2):
+        value *= _SPICE_SUFFIX[match.group(2).lower()]
+    return value
+
+
+def _parse_step_text(file_name):
+    #Leitura e conversão do arquivo texto exportado pelo LtSpice.
+    with open(file_name, 'r') as file:
+        text = file.read()
+
+    #Trechos numéricos entre as linhas de texto (ou linhas em branco).
+    separators = list(_SEPARATOR_LINE.finditer(text))
+    bounds = [0] + [i for m in separators for i in (m.start(), m.end())] + \
+        [len(text)]
+    blocks = [text[bounds[i]:bounds[i+1]].strip()
+              for i in range(0, len(bounds), 2)]
+    blocks = [block for block in blocks if block]
+
+    rows = np.array([block.count('\n') + 1 for block in blocks], dtype=int)
+    offsets = np.concatenate(([0], np.cumsum(rows)))
+    values = np.fromstring(' '.join(blocks), dtype=float, sep=' ')
+    data = values.reshape(offsets[-1], -1) if len(blocks) else \
+        np.empty((0, 0))
+
+    step_parameters = []
+    for match in separators:
+        line = match.group(0)
+        if ('Step Information' in line):
+            end = line.rfind('(Run')
+            line = line[line.find(':')+1:end if (end >= 0) else None]
+            step_parameters.append(
+                {name: spice_number(value)
+                 for name, value in _STEP_PARAMETER.findall(line)})
+
+    return data, offsets, step_parameters
+
+
+def _cache_paths(file_name, cache_dir=None):
+    #Arquivos do cache: dados (.npy) e metadados (.json). Sem "cache_dir", o
+    #cache fica ao lado do arquivo original; com "cache_dir", o nome inclui
+    #um hash do caminho completo para evitar colisões.
+    path = os.path.abspath(file_name)
+    if (cache_dir is None):
+        base = path + '.stepcache'
+    else:
+        digest = hashlib.sha1(path.encode('utf-8')).hexdigest()[:16]
+        base = os.path.join(cache_dir, '{}.{}.stepcache'.format(
+            os.path.basename(path), digest))
+    return base + '.npy', base + '.json'
+
+
+def _cache_key(file_name):
+    status = os.stat(file_name)
+    return {'path': os.path.abspath(file_name), 'size': status.st_size,
+            'mtime_ns': status.st_mtime_ns}
+
+
+def _cached_parse(file_name, cache_dir=None, refresh=False):
+    #Carrega os dados do cache (mapeados em memória) quando a chave
+    #(caminho, tamanho e data de modificação) coincidir; caso contrário,
+    #converte o arquivo texto e recria o cache.
+    data_path, meta_path = _cache_paths(file_name, cache_dir)
+    key = _cache_key(file_name)
+    if (not refresh) and os.path.exists(data_path) and \
+            os.path.exists(meta_path):
+        with open(meta_path, 'r') as file:
+            meta = json.load(file)
+        if (meta.get('key') == key):
+            data = np.load(data_path, mmap_mode='r')
+            return data, np.array(meta['offsets'], dtype=int), \
+                meta['parameters']
+
+    data, offsets, step_parameters = _parse_step_text(file_name)
+    if (cache_dir is not None):
+        os.makedirs(cache_dir, exist_ok=True)
+    np.save(data_path, data)
+    with open(meta_path, 'w') as file:
+        json.dump({'key': key, 'offsets': offsets.tolist(),
+                   'parameters': step_parameters}, file)
+    return data, offsets, step_parameters
+
+
+def step_cache_clear(file_name: str, cache_dir: str = None):
+    """
+    Remove o cache de "step_import" de um arquivo, forçando uma nova
+    conversão na próxima importação.
+
+    Args:
+        file_name (str):
+            Nome do arquivo original (texto exportado pelo LtSpice).
+
+        cache_dir (str, optional): Defaults to None.
+            Diretório do cache, o mesmo utilizado em "step_import".
+    """
+    for path in _cache_paths(file_name, cache_dir):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def step_import(file_name: str, contiguous: bool = False,
+                parameters: bool = False, cache: bool = False,
+                cache_dir: str = None, refresh: bool = False):
     """
     Importa arquivos gerados pelo LtSpice com a função ".step" separando cada
     passo em uma lista independente, organizando os dados em uma lista de
@@ -17,41 +141,253 @@ def step_import(file_name: str):
     Caso não seja utilizada a função "step" do LtSpice, a lista resultante
     desta função possuirá apenas um array.
     
-    Obs.:
-        Esta versão da função utiliza uma versão do "numpy.fromstring" que
-        gera um DeprecationWarning. Em versões futuras do numpy, quando o
-        "numpy.fromstring" gerar um Exception, será necessário atualizar esta
-        função.
+    O arquivo é lido de uma só vez, os limites de cada "step" são encontrados
+    em uma única busca e todos os valores numéricos são convertidos em uma
+    única chamada ao numpy, gerando um único array contíguo. Os arrays de
+    cada "step" são views deste array.
     
     Args:
         file_name (str): 
             Nome do arquivo com os dados a serem importados. 
             Ex.: 'dados.txt'
 
+        contiguous (bool, optional): Defaults to False.
+            Caso True, retorna o array contíguo com os dados de todos os
+            "steps" e o vetor de offsets no lugar da lista de arrays.
+
+        parameters (bool, optional): Defaults to False.
+            Caso True, retorna também os parâmetros de cada "step", lidos das
+            linhas "Step Information" do arquivo.
+
+        cache (bool, optional): Defaults to False.
+            Caso True, os dados convertidos são salvos em um cache binário
+            (".npy" + ".json") na primeira importação e, nas seguintes, são
+            carregados do cache mapeados em memória (somente leitura). O cache
+            é descartado automaticamente quando o caminho, o tamanho ou a data
+            de modificação do arquivo original mudarem.
+
+        cache_dir (str, optional): Defaults to None.
+            Diretório do cache. Caso não seja fornecido, o cache é salvo ao
+            lado do arquivo original ('<file_name>.stepcache.npy').
+
+        refresh (bool, optional): Defaults to False.
+            Caso True, ignora o cache existente e o recria.
+            Ver também "step_cache_clear".
+
     Returns:
         final_table_list (list):
             Lista de arrays com os dados separados por "step".
+            Caso "contiguous" seja True, retorna no lugar dela:
+
+            data (2D-array):
+                Dados de todos os "steps", concatenados.
+
+            offsets (1D-array):
+                Linha inicial de cada "step" em "data", com um elemento
+                final igual ao número de linhas: o "step" i corresponde a
+                data[offsets[i]:offsets[i+1]].
+
+        step_parameters (list of dict, somente se "parameters" for True):
+            Parâmetros de cada "step", ex.: [{'R': 1000.0}, {'R': 2000.0}].
+            Valores no formato do SPICE são convertidos em float.
     """
-    with open(file_name, 'r') as file:
-        final_table_list = []
-        temp_table_data = []
-        valid_line = False
-        
-        for line in file:
-            line_data = np.fromstring(line, dtype=float, sep='\t')
-            
-            #Quando "numpy.fromstring" gerar exception, substituir o
-            #"if" "else" por "try" "except" e colocar a atribuição de
-            #"line_data" dentro do "try".
-            if (len(line_data) > 0):
-                valid_line = True
-                temp_table_data.append(line_data)
-            else:
-                if valid_line:
-                    final_table_list.append(np.vstack(temp_table_data))
-                    temp_table_data = []
-                valid_line = False
-                
-        final_table_list.append(np.vstack(temp_table_data))
-        
-    return final_table_list
+    if cache:
+        data, offsets, step_parameters = _cached_parse(file_name, cache_dir,
+                                                       refresh)
+    else:
+        data, offsets, step_parameters = _parse_step_text(file_name)
+
+    if contiguous:
+        output = (data, offsets)
+    else:
+        output = ([data[offsets[i]:offsets[i+1]]
+                   for i in range(len(offsets)-1)],)
+
+    if parameters:
+        output += (step_parameters,)
+
+    return output[0] if (len(output) == 1) else output
+
+
+class RawFile:
+    """
+    Leitor dos arquivos binários ".raw" gerados pelo LtSpice.
+
+    O cabeçalho (texto em UTF-16 ou ASCII) é interpretado e o bloco de dados
+    binários é mapeado em memória (numpy.memmap), sem cópia. Cada traço é
+    obtido como uma view do mapa, de modo que apenas os dados efetivamente
+    utilizados são lidos do disco.
+
+    Formatos suportados:
+        - Real (padrão): eixo (tempo) em float64 e demais traços em float32.
+        - "double": todos os traços em float64.
+        - "complex" (análise AC): todos os traços em complex128.
+        - "fastaccess": dados armazenados traço a traço em vez de ponto a
+          ponto.
+        - Eixo de tempo comprimido: o LtSpice marca alguns pontos com o
+          sinal negativo no tempo, que é removido pela leitura do eixo.
+
+    Em simulações com ".step", o início de cada "step" é identificado pelo
+    recomeço do eixo (tempo ou frequência).
+
+    Args:
+        file_name (str):
+            Nome do arquivo ".raw".
+
+    Exemplo de uso:
+        raw = RawFile('simulacao.raw')
+        print(raw.variables)
+        vout = raw.trace('V(out)', step=3)
+    """
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.header, data_offset = self._read_header(file_name)
+
+        self.flags = self.header.get('Flags', '').lower().split()
+        self.n_variables = int(self.header['No. Variables'])
+        self.n_points = int(self.header['No. Points'])
+        self.variables = [line.split()[1]
+                          for line in self.header['Variables']]
+
+        self._complex = 'complex' in self.flags
+        complex_data = self._complex
+        double_data = ('double' in self.flags) or complex_data
+        axis_type = np.complex128 if complex_data else np.float64
+        trace_type = axis_type if double_data else np.float32
+        types = [axis_type] + [trace_type]*(self.n_variables-1)
+
+        if ('fastaccess' in self.flags):
+            #Traço a traço: um memmap contíguo por variável.
+            self._traces = []
+            offset = data_offset
+            for dtype in types:
+                self._traces.append(np.memmap(file_name, dtype=dtype,
+                                              mode='r', offset=offset,
+                                              shape=(self.n_points,)))
+                offset += self.n_points * np.dtype(dtype).itemsize
+        else:
+            #Ponto a ponto: um único memmap com dtype estruturado, sendo cada
+            #traço uma view (com passo) de um dos campos.
+            dtype = np.dtype({'names': ['f{}'.format(i)
+                                        for i in range(self.n_variables)],
+                              'formats': types})
+            records = np.memmap(file_name, dtype=dtype, mode='r',
+                                offset=data_offset, shape=(self.n_points,))
+            self._traces = [records[name] for name in dtype.names]
+
+    #O eixo e os offsets dos "steps" são calculados apenas quando
+    #necessários: no formato ponto a ponto o eixo está espalhado por todo o
+    #bloco de dados, e lê-lo exigiria ler o arquivo inteiro.
+    @cached_property
+    def axis(self):
+        #Remoção da marcação de compressão (sinal negativo) do eixo.
+        return self._traces[0].real if self._complex else \
+            np.abs(self._traces[0])
+
+    @cached_property
+    def offsets(self):
+        restarts = np.flatnonzero(np.diff(self.axis) < 0) + 1 \
+            if ('stepped' in self.flags) else np.array([], dtype=int)
+        return np.concatenate(([0], restarts, [self.n_points]))
+
+    @staticmethod
+    def _read_header(file_name):
+        #Lê o cabeçalho até a linha "Binary:", detectando a codificação.
+        with open(file_name, 'rb') as file:
+            start = file.read(2)
+            utf16 = (len(start) == 2) and (start[1] == 0)
+            encoding = 'utf-16-le' if utf16 else 'latin-1'
+            marker = 'Binary:\n'.encode(encoding)
+            file.seek(0)
+            raw = b''
+            while (marker not in raw):
+                chunk = file.read(65536)
+                if not chunk:
+                    if ('Values:\n'.encode(encoding) in raw):
+                        raise Exception('Arquivo .raw em formato ASCII não '\
+                                        'suportado!')
+                    raise Exception('Cabeçalho do arquivo .raw inválido!')
+                raw += chunk
+        end = raw.index(marker) + len(marker)
+        text = raw[:end].decode(encoding).replace('\r', '')
+
+        header = {'Variables': []}
+        in_variables = False
+        for line in text.split('\n'):
+            if in_variables and line.startswith(('\t', ' ')):
+                header['Variables'].append(line.strip())
+                continue
+            in_variables = False
+            key, _, value = line.partition(':')
+            if (key == 'Variables'):
+                in_variables = True
+            elif key and (key != 'Binary'):
+                header[key] = value.strip()
+        return header, end
+
+    @property
+    def n_steps(self):
+        return len(self.offsets) - 1
+
+    def _index(self, name):
+        if (name not in self.variables):
+            raise Exception('Traço inexistente: {}'.format(name))
+        return self.variables.index(name)
+
+    def trace(self, name, step=None):
+        """
+        Retorna um traço como view do arquivo mapeado em memória.
+
+        Args:
+            name (str):
+                Nome do traço (ex.: 'V(out)'). O eixo (ex.: 'time') é
+                retornado sem a marcação de compressão.
+
+            step (int, optional): Defaults to None.
+                Índice do "step". Caso não seja fornecido, retorna todos os
+                pontos de todos os "steps".
+
+        Returns:
+            1D-array:
+                Valores do traço.
+        """
+        index = self._index(name)
+        data = self.axis if (index == 0) else self._traces[index]
+        if (step is None):
+            return data
+        return data[self.offsets[step]:self.offsets[step+1]]
+
+    def step(self, step, traces=None):
+        """
+        Retorna os dados de um "step" como 2D-array (pontos x traços), no
+        mesmo formato de cada elemento da lista gerada por "step_import".
+
+        Args:
+            step (int):
+                Índice do "step".
+
+            traces (string-list, optional): Defaults to None.
+                Traços a serem lidos. Caso não seja fornecido, lê todos.
+        """
+        traces = self.variables if (traces is None) else traces
+        return np.column_stack([self.trace(name, step) for name in traces])
+
+
+def raw_import(file_name: str, traces=None):
+    """
+    Importa um arquivo binário ".raw" do LtSpice no mesmo formato de
+    "step_import": uma lista de 2D-arrays, um por "step".
+
+    Args:
+        file_name (str):
+            Nome do arquivo ".raw".
+
+        traces (string-list, optional): Defaults to None.
+            Traços a serem lidos. Caso não seja fornecido, lê todos.
+
+    Returns:
+        list:
+            Lista de arrays com os dados separados por "step".
+    """
+    raw = RawFile(file_name)
+    return [raw.step(i, traces) for i in range(raw.n_steps)]
@@ -16,6 +16,14 @@ Funções disponíveis:
         - bin2int_list: 
             x = [signed_bin2int(b_0...b_n), ..., signed_bin2int(b_h...b_N)]
 
+        - gray2bin:
+            Conversão de código Gray para binário.
+
+        - bin2int_matrix:
+            Decodificação vetorizada de uma população (N, bits), equivalente
+            a bin2int_list aplicada em cada linha, com suporte a código Gray
+            e escalonamento para um domínio real.
+
     Funções de teste em domínio contínuo:
         - full_nan: y = NaN para todo x_n
         - nan_sphere([x_1...x_n]): y = f(x_1...x_n) com NaN para todo x_n<0
@@ -26,15 +34,33 @@ Funções disponíveis:
         - holder([x_1...x_n]): y = f(x_1...x_n)
         - crossintray([x_1...x_n]): y = f(x_1...x_n)
         - styblinski_tang([x_1...x_n]): y = f(x_1...x_n)
+
+    Todas as funções de teste em domínio contínuo também aceitam uma população
+    inteira como 2D-array (N, D), retornando um 1D-array (N,) com a avaliação
+    de cada indivíduo (linha) de forma vetorizada.
+
+    Gradientes analíticos (vetorizados, retornam (valor, gradiente)):
+        - sphere_grad, rastrigin_grad, rosenbrock_grad, styblinski_tang_grad
+        - rosenbrock_hessp(x, p): Produto Hessiana-vetor da Rosenbrock.
+
+    Catálogo das funções de teste:
+        - BENCHMARKS: dicionário {nome: BenchmarkInfo} com os limites
+          recomendados, as dimensões válidas e o ótimo global conhecido de
+          cada função.
+        - get_benchmark(nome): Retorna o BenchmarkInfo de uma função.
 """
 # %%
 import numpy as np
 import math as mt
+from collections import namedtuple
 
 #---------------------------------------
 #Funções para testar algoritmos de otimização binários
 def bin2int(b):
-    return int(sum([mt.pow(2,x)*b[::-1][x] for x in range(len(b))]))
+    total = 0
+    for bit in b:
+        total = 2*total + int(bit)
+    return total
 
 def signed_bin2int(b):
     return int(bin2int(b[1:])*(mt.pow(-1,b[0]*(-1))))
@@ -50,68 +76,270 @@ def bin2int_list(b, variables_count):
         final += int(bits_per_var)
         output_list.append(signed_bin2int(b[init:final]))
     return output_list
+
+def gray2bin(b):
+    #Conversão Gray -> Binário ao longo do último eixo (XOR acumulado).
+    b = np.asarray(b, dtype=np.int64)
+    return np.bitwise_and(np.cumsum(b, axis=-1), 1)
+
+def bin2int_matrix(b, variables_count, signed=True, gray=False, bounds=None):
+    """
+    Decodifica de uma só vez uma população binária (N, bits) em uma matriz
+    (N, variables_count), equivalente a aplicar "bin2int_list" em cada linha.
+
+    Args:
+        b (2D-array de 0/1):
+            Matriz de cromossomos, um indivíduo por linha. Um 1D-array é
+            tratado como um único indivíduo.
+
+        variables_count (int):
+            Número de variáveis codificadas em cada cromossomo.
+
+        signed (bool, optional): Defaults to True.
+            Utiliza a convenção de "signed_bin2int", onde o primeiro bit de
+            cada variável é o sinal (1 -> negativo). Caso False, utiliza a
+            convenção de "bin2int".
+
+        gray (bool, optional): Defaults to False.
+            Indica que os bits de magnitude estão em código Gray. O bit de
+            sinal, quando existir, não é afetado.
+
+        bounds (tuple/2D-array, optional): Defaults to None.
+            Limites (inferior, superior) do domínio real. Podem ser escalares
+            ou vetores com um valor por variável. Caso fornecidos, o menor e
+            o maior inteiro representáveis são mapeados linearmente nos
+            limites inferior e superior, respectivamente.
+
+    Returns:
+        2D-array:
+            Matriz (N, variables_count) de inteiros (int64) ou, caso "bounds"
+            seja fornecido, de reais (float64).
+    """
+    b = np.asarray(b, dtype=np.int64)
+    if (b.ndim < 2):
+        b = b.reshape(1, -1)
+    if ((b.shape[1] % variables_count) != 0):
+        raise Exception('Insufficient bits!')
+    bits_per_var = b.shape[1] // variables_count
+    b = b.reshape(b.shape[0], variables_count, bits_per_var)
+
+    if signed:
+        sign = 1 - 2*b[:,:,0]
+        b = b[:,:,1:]
+    magnitude_bits = b.shape[2]
+    if (magnitude_bits > 62):
+        raise Exception('Too many bits per variable!')
+
+    if gray:
+        b = gray2bin(b)
+
+    #Produto escalar com as potências de 2 (bit mais significativo primeiro).
+    weights = np.left_shift(1, np.arange(magnitude_bits-1, -1, -1, dtype=np.int64))
+    output = b @ weights
+
+    max_value = (1 << magnitude_bits) - 1
+    if signed:
+        output = output * sign
+        min_value = -max_value
+    else:
+        min_value = 0
+
+    if (bounds is None):
+        return output
+
+    lower = np.asarray(bounds[0], dtype=float)
+    upper = np.asarray(bounds[1], dtype=float)
+    if (max_value == min_value):
+        return np.broadcast_to(lower, output.shape).copy()
+    return lower + (output - min_value)*(upper - lower)/(max_value - min_value)
 #---------------------------------------
 
+def _population(x):
+    #Converte a entrada em uma matriz (N, D) de indivíduos.
+    #Retorna também se a entrada original já era uma população (2D) para que
+    #as chamadas com um único indivíduo continuem retornando um escalar.
+    x = np.asarray(x)
+    if (x.ndim > 1):
+        return x, True
+    return x.reshape(1, -1), False
+
+def _fitness(y, batched):
+    #Retorna o vetor (N,) de avaliações ou o escalar do único indivíduo.
+    return y if batched else y[0]
+
 def full_nan(x):
     #Gerador de NaNs
-    return np.nan
+    x, batched = _population(x)
+    return _fitness(np.full(x.shape[0], np.nan), batched)
 
 def nan_sphere(x):
     #Sphere function with negative domain as NaN
-    total = 0
-    for i in range(len(x)):
-        if (x[i]<0):
-            total = np.nan
-        else:
-            total += x[i]**2
-    return total
+    x, batched = _population(x)
+    total = np.sum(x**2, axis=1)
+    total = np.where(np.any(x<0, axis=1), np.nan, total)
+    return _fitness(total, batched)
 
 def constant(x):
     #Constant plane to test algorithm comportment in
     #an extreme exploration scenario.
-    return -1
+    x, batched = _population(x)
+    return _fitness(np.full(x.shape[0], -1), batched)
 
 def sphere(x):
     #Sphere function
-    total = 0
-    for i in range(len(x)):
-        total += x[i]**2
-    return total
+    x, batched = _population(x)
+    return _fitness(np.sum(x**2, axis=1), batched)
 
 def rastrigin(x):
     #Rastringin function
-	return 10*len(x) + sum([(xi**2 - 10 * np.cos(2 * np.pi * xi)) for xi in x])
+    x, batched = _population(x)
+    total = 10*x.shape[1] + np.sum(x**2 - 10 * np.cos(2 * np.pi * x), axis=1)
+    return _fitness(total, batched)
 
 def rosenbrock(x):
     #Rosenbrock function
-	total = 0
-	for i in range(len(x)-1):
-		total += 100*((x[i]**2 - x[i+1])**2) + (1-x[i])**2
-	return total
+    x, batched = _population(x)
+    total = np.sum(100*((x[:,:-1]**2 - x[:,1:])**2) + (1-x[:,:-1])**2, axis=1)
+    return _fitness(total, batched)
 
 def holder(x):
     #Holder-Table Function
-    product_factor = 1
-    sum_factor = 0
-    for i in range(len(x)):
-        product_factor *= np.cos(x[i]) if (i%2) else np.sin(x[i])
-        sum_factor += x[i]**2
+    x, batched = _population(x)
+    #Posições pares usam seno e posições ímpares usam cosseno.
+    odd = (np.arange(x.shape[1]) % 2).astype(bool)
+    product_factor = np.prod(np.where(odd, np.cos(x), np.sin(x)), axis=1)
+    sum_factor = np.sum(x**2, axis=1)
     sum_factor = np.exp(np.abs(1 - np.sqrt(sum_factor)/np.pi))
-    return (-1)*np.abs(product_factor * sum_factor)
+    return _fitness((-1)*np.abs(product_factor * sum_factor), batched)
 
 def crossintray(x):
     #Cross-in-tray Function
-    product_factor = 1
-    sum_factor = 0
-    for i in range(len(x)):
-        product_factor *= np.sin(x[i])
-        sum_factor += x[i]**2
+    x, batched = _population(x)
+    product_factor = np.prod(np.sin(x), axis=1)
+    sum_factor = np.sum(x**2, axis=1)
     sum_factor = np.exp(np.abs(100 - np.sqrt(sum_factor)/np.pi))
-    return (-0.0001)*((np.abs(product_factor * sum_factor)+1)**0.1)
+    total = (-0.0001)*((np.abs(product_factor * sum_factor)+1)**0.1)
+    return _fitness(total, batched)
 
 def styblinski_tang(x):
     #Styblinski-Tang Function
-    total = 0
-    for i in range(len(x)):
-        total += (x[i]**4) - (16*x[i]**2) + (5*x[i])
-    return total/2
+    x, batched = _population(x)
+    total = np.sum((x**4) - (16*x**2) + (5*x), axis=1)
+    return _fitness(total/2, batched)
+
+#---------------------------------------
+#Gradientes analíticos das funções suaves.
+#Retornam a tupla (valor, gradiente): para um único indivíduo (escalar,
+#1D-array (D,)) e para uma população (1D-array (N,), 2D-array (N, D)).
+def _gradient(y, g, batched):
+    return (y, g) if batched else (y[0], g[0])
+
+def sphere_grad(x):
+    #Sphere function and gradient
+    x, batched = _population(x)
+    return _gradient(np.sum(x**2, axis=1), 2*x, batched)
+
+def rastrigin_grad(x):
+    #Rastringin function and gradient
+    x, batched = _population(x)
+    angle = 2 * np.pi * x
+    total = 10*x.shape[1] + np.sum(x**2 - 10 * np.cos(angle), axis=1)
+    gradient = 2*x + 20 * np.pi * np.sin(angle)
+    return _gradient(total, gradient, batched)
+
+def rosenbrock_grad(x):
+    #Rosenbrock function and gradient
+    x, batched = _population(x)
+    x = x.astype(float, copy=False)
+    head, tail = x[:,:-1], x[:,1:]
+    residual = head**2 - tail
+    total = np.sum(100*(residual**2) + (1-head)**2, axis=1)
+    gradient = np.zeros_like(x)
+    gradient[:,:-1] = 400*head*residual - 2*(1-head)
+    gradient[:,1:] += -200*residual
+    return _gradient(total, gradient, batched)
+
+def rosenbrock_hessp(x, p):
+    #Produto Hessiana-vetor da Rosenbrock: H(x) @ p, sem montar a Hessiana.
+    #"p" deve ter o mesmo formato de "x".
+    x, batched = _population(x)
+    x = x.astype(float, copy=False)
+    p = np.asarray(p, dtype=float).reshape(x.shape)
+    head, tail = x[:,:-1], x[:,1:]
+    diagonal = np.zeros_like(x)
+    diagonal[:,:-1] = 1200*head**2 - 400*tail + 2
+    diagonal[:,1:] += 200
+    off_diagonal = -400*head
+    output = diagonal*p
+    output[:,:-1] += off_diagonal*p[:,1:]
+    output[:,1:] += off_diagonal*p[:,:-1]
+    return output if batched else output[0]
+
+def styblinski_tang_grad(x):
+    #Styblinski-Tang Function and gradient
+    x, batched = _population(x)
+    total = np.sum((x**4) - (16*x**2) + (5*x), axis=1)/2
+    gradient = (4*x**3 - 32*x + 5)/2
+    return _gradient(total, gradient, batched)
+
+#---------------------------------------
+#Catálogo das funções de teste
+BenchmarkInfo = namedtuple('BenchmarkInfo',
+                           ['function', 'bounds', 'min_dimension',
+                            'max_dimension', 'minimum', 'argmin'])
+BenchmarkInfo.__doc__ = """
+Metadados de uma função de teste:
+    - function: Função de teste.
+    - bounds: (inferior, superior) recomendados para todas as variáveis.
+    - min_dimension / max_dimension: Dimensões válidas (None = ilimitada).
+    - minimum(D): Valor do ótimo global em dimensão D (None = desconhecido).
+    - argmin(D): Um ponto de ótimo global em dimensão D (None = desconhecido).
+"""
+
+BENCHMARKS = {
+    'full_nan': BenchmarkInfo(full_nan, (-5.12, 5.12), 1, None,
+                              lambda d: None, lambda d: None),
+    'nan_sphere': BenchmarkInfo(nan_sphere, (-5.12, 5.12), 1, None,
+                                lambda d: 0.0, lambda d: np.zeros(d)),
+    'constant': BenchmarkInfo(constant, (-5.12, 5.12), 1, None,
+                              lambda d: -1.0, lambda d: np.zeros(d)),
+    'sphere': BenchmarkInfo(sphere, (-5.12, 5.12), 1, None,
+                            lambda d: 0.0, lambda d: np.zeros(d)),
+    'rastrigin': BenchmarkInfo(rastrigin, (-5.12, 5.12), 1, None,
+                               lambda d: 0.0, lambda d: np.zeros(d)),
+    'rosenbrock': BenchmarkInfo(rosenbrock, (-5.0, 10.0), 2, None,
+                                lambda d: 0.0, lambda d: np.ones(d)),
+    'holder': BenchmarkInfo(holder, (-10.0, 10.0), 2, 2,
+                            lambda d: -19.2085025678845,
+                            lambda d: np.array([8.05502347, 9.66459043])),
+    'crossintray': BenchmarkInfo(crossintray, (-10.0, 10.0), 2, 2,
+                                 lambda d: -2.06261187082274,
+                                 lambda d: np.array([1.34940660, 1.34940660])),
+    'styblinski_tang': BenchmarkInfo(styblinski_tang, (-5.0, 5.0), 1, None,
+                                     lambda d: -39.1661657037714*d,
+                                     lambda d: np.full(d, -2.90353401818596)),
+    }
+
+def get_benchmark(name):
+    """
+    Retorna os metadados de uma função de teste do catálogo.
+
+    Args:
+        name (string):
+            Nome da função de teste (chave de BENCHMARKS).
+
+    Returns:
+        BenchmarkInfo:
+            Metadados da função de teste.
+    """
+    if (name not in BENCHMARKS):
+        raise Exception('Unknown benchmark function: {}'.format(name))
+    return BENCHMARKS[name]
+
+def valid_dimension(name, dimension):
+    #Verifica se a dimensão é aceita pela função de teste "name".
+    info = get_benchmark(name)
+    if (dimension < info.min_dimension):
+        return False
+    return (info.max_dimension is None) or (dimension <= info.max_dimension)
+#---------------------------------------
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+# %%
+"""
+Ferramentas para comparar otimizadores utilizando o catálogo de funções de
+teste de "benchmark_functions" (BENCHMARKS).
+
+Cada experimento é a execução de um otimizador em uma combinação
+(função, dimensão, semente). A função objetivo entregue ao otimizador é
+envolvida por um contador que registra o número de avaliações (inclusive em
+chamadas com populações (N, D)) e a curva de convergência do melhor valor
+encontrado até o momento.
+
+Interface esperada do otimizador:
+    optimizer(objective, bounds, dimension, max_evaluations, seed)
+        - objective: Função objetivo (aceita 1D-array ou 2D-array (N, D)).
+        - bounds: 2D-array (2, D) com os limites inferior e superior.
+        - dimension: Número de variáveis.
+        - max_evaluations: Orçamento de avaliações (pode ser None).
+        - seed: Semente do gerador de números aleatórios.
+    O valor retornado pelo otimizador é ignorado, os resultados são obtidos
+    pelo contador de avaliações.
+
+Funções disponíveis:
+    - run_benchmark: Executa os experimentos e retorna a lista de resultados.
+    - results_export: Salva a tabela de resultados (e as curvas) em arquivo.
+    - random_search: Otimizador de referência (busca aleatória).
+"""
+# %%
+import csv
+import time
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from benchmark_functions import BENCHMARKS, get_benchmark, valid_dimension
+
+RESULT_FIELDS = ['optimizer', 'function', 'dimension', 'seed', 'evaluations',
+                 'time', 'best', 'error']
+
+
+class _CountingObjective:
+    #Envolve a função de teste contando as avaliações e registrando apenas os
+    #pontos onde o melhor valor melhora (curva de convergência compacta).
+    def __init__(self, function):
+        self.function = function
+        self.evaluations = 0
+        self.best = np.inf
+        self.curve_evaluations = []
+        self.curve_values = []
+
+    def __call__(self, x):
+        y = self.function(x)
+        values = np.atleast_1d(np.asarray(y, dtype=float))
+        #NaN não é considerado melhoria.
+        running = np.fmin.accumulate(np.concatenate(([self.best], values)))[1:]
+        improved = np.flatnonzero(running < np.concatenate(([self.best],
+                                                             running[:-1])))
+        for i in improved:
+            self.curve_evaluations.append(self.evaluations + i + 1)
+            self.curve_values.append(running[i])
+        if (len(values) > 0):
+            self.best = min(self.best, running[-1])
+        self.evaluations += len(values)
+        return y
+
+
+def _run_single(optimizer, name, dimension, seed, max_evaluations):
+    #Executa um experimento. Definida no nível do módulo para que possa ser
+    #enviada aos processos do pool.
+    info = get_benchmark(name)
+    bounds = np.array([np.full(dimension, info.bounds[0]),
+                       np.full(dimension, info.bounds[1])])
+    objective = _CountingObjective(info.function)
+
+    start = time.perf_counter()
+    optimizer(objective, bounds, dimension, max_evaluations, seed)
+    elapsed = time.perf_counter() - start
+
+    minimum = info.minimum(dimension)
+    error = np.nan if (minimum is None) else objective.best - minimum
+    return {'optimizer': getattr(optimizer, '__name__', str(optimizer)),
+            'function': name,
+            'dimension': dimension,
+            'seed': seed,
+            'evaluations': objective.evaluations,
+            'time': elapsed,
+            'best': objective.best,
+            'error': error,
+            'curve': np.array([objective.curve_evaluations,
+                               objective.curve_values]),
+            }
+
+
+def run_benchmark(optimizer, functions=None, dimensions=(2, 10),
+                  seeds=range(10), max_evaluations=None, workers=1):
+    """
+    Executa "optimizer" em todas as combinações de funções, dimensões e
+    sementes. Combinações com dimensão inválida para a função (ex.: "holder"
+    só aceita 2 dimensões) são ignoradas.
+
+    Args:
+        optimizer (callable):
+            Otimizador a ser avaliado (ver interface no cabeçalho do módulo).
+            Para "workers" > 1 deve ser serializável (definido no nível do
+            módulo).
+
+        functions (string-list, optional): Defaults to None.
+            Nomes das funções de BENCHMARKS. Caso não seja fornecido, utiliza
+            todas as funções com ótimo global conhecido.
+
+        dimensions (int-list, optional): Defaults to (2, 10).
+            Dimensões a serem testadas.
+
+        seeds (int-list, optional): Defaults to range(10).
+            Sementes de cada repetição.
+
+        max_evaluations (int, optional): Defaults to None.
+            Orçamento de avaliações repassado ao otimizador.
+
+        workers (int, optional): Defaults to 1.
+            Número de processos utilizados para executar os experimentos.
+
+    Returns:
+        list of dict:
+            Um dicionário por experimento com os campos de RESULT_FIELDS e
+            "curve", 2D-array (2, K) com o número da avaliação e o melhor
+            valor a cada melhoria.
+    """
+    if (functions is None):
+        functions = [name for name, info in BENCHMARKS.items()
+                     if (info.minimum(info.min_dimension) is not None)
+                     and (name != 'constant')]
+
+    jobs = [(name, dimension, seed) for name, dimension, seed
+            in itertools.product(functions, dimensions, seeds)
+            if valid_dimension(name, dimension)]
+
+    if (workers <= 1):
+        return [_run_single(optimizer, name, dimension, seed, max_evaluations)
+                for name, dimension, seed in jobs]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_run_single, optimizer, name, dimension,
+                                   seed, max_evaluations)
+                   for name, dimension, seed in jobs]
+        return [future.result() for future in futures]
+
+
+def results_export(file_name, results, curves_file=None, separator='\t'):
+    """
+    Salva a tabela de resultados de "run_benchmark" em arquivo de texto, uma
+    linha por experimento, com as colunas de RESULT_FIELDS.
+
+    Args:
+        file_name (string):
+            Nome do arquivo da tabela de resultados.
+
+        results (list of dict):
+            Resultados retornados por "run_benchmark".
+
+        curves_file (string, optional): Defaults to None.
+            Caso fornecido, salva as curvas de convergência em um arquivo
+            ".npz", uma entrada por experimento, nomeada na forma
+            "<otimizador>_<função>_<dimensão>_<semente>", de modo que os
+            resultados de vários otimizadores podem ser salvos juntos.
+
+        separator (string, optional): Defaults to TAB ('\\t').
+            Caractere delimitador das colunas.
+    """
+    with open(file_name, 'w', newline='') as file:
+        writer = csv.writer(file, delimiter=separator)
+        writer.writerow(RESULT_FIELDS)
+        for result in results:
+            writer.writerow([result[field] for field in RESULT_FIELDS])
+
+    if (curves_file is not None):
+        np.savez_compressed(curves_file, **{
+            '{}_{}_{}_{}'.format(r['optimizer'], r['function'],
+                                 r['dimension'], r['seed']):
+            r['curve'] for r in results})
+
+
+def random_search(objective, bounds, dimension, max_evaluations, seed,
+                  population_size=1000):
+    """
+    Busca aleatória uniforme, utilizada como referência mínima de desempenho.
+    Avalia populações inteiras de uma só vez.
+    """
+    rng = np.random.default_rng(seed)
+    budget = max_evaluations if max_evaluations else 10*population_size
+    while (budget > 0):
+        size = min(population_size, budget)
+        objective(rng.uniform(bounds[0], bounds[1], size=(size, dimension)))
+        budget -= size
+
+
+
+if (__name__ == '__main__'):
+    results = run_benchmark(random_search, seeds=range(3),
+                            max_evaluations=10000)
+    for r in results:
+        print('{function:>16} D={dimension:<3} seed={seed} '\
+              'evals={evaluations} best={best:0.4f} '\
+              'time={time:0.4f}s'.format(**r))
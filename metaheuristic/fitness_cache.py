@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+# %%
+"""
+Cache de avaliações para algoritmos genéticos binários.
+
+Cada genoma (vetor de 0/1) é compactado com "numpy.packbits" e os bytes
+resultantes são utilizados como chave de um cache LRU limitado. Na avaliação
+de uma população inteira, os genomas repetidos são eliminados antes de
+qualquer chamada à função objetivo, de modo que cada genoma inédito é avaliado
+uma única vez, mesmo que apareça várias vezes na mesma geração.
+
+Funções disponíveis:
+    - BinaryFitnessCache: Cache LRU de avaliações de genomas binários.
+"""
+# %%
+from collections import OrderedDict, namedtuple
+import numpy as np
+
+CacheInfo = namedtuple('CacheInfo',
+                       ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+
+
+class BinaryFitnessCache:
+    """
+    Cache LRU de avaliações de genomas binários.
+
+    Args:
+        objective (callable):
+            Função objetivo que recebe um genoma binário (1D-array de 0/1) e
+            retorna um escalar. Normalmente combina "bin2int_list" (ou
+            "bin2int_matrix") com uma das funções de "benchmark_functions".
+
+        maxsize (int, optional): Defaults to 100000.
+            Número máximo de genomas armazenados. Ao ser atingido, os genomas
+            utilizados há mais tempo são descartados.
+
+        evaluator (callable, optional): Defaults to None.
+            Função que avalia uma população (N, bits) de genomas inéditos e
+            retorna um vetor (N,), por exemplo um "PopulationEvaluator" ou uma
+            função objetivo vetorizada. Caso não seja fornecida, "objective"
+            é chamada para cada genoma inédito.
+
+    Exemplo de uso:
+        cache = BinaryFitnessCache(lambda b: sphere(bin2int_list(b, 2)))
+        fitness = cache.evaluate(population)
+        print(cache.info())
+    """
+    def __init__(self, objective, maxsize=100000, evaluator=None):
+        if (maxsize < 1):
+            raise Exception('maxsize must be positive!')
+        self.objective = objective
+        self.maxsize = maxsize
+        self.evaluator = evaluator
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+    def __call__(self, genome):
+        return self.evaluate(np.asarray(genome).reshape(1, -1))[0]
+
+    @staticmethod
+    def _keys(population):
+        #Compacta cada linha em bytes. O número de bits é adicionado à chave
+        #para diferenciar genomas de tamanhos diferentes com o mesmo padding.
+        packed = np.packbits(population.astype(bool), axis=1)
+        suffix = population.shape[1].to_bytes(4, 'little')
+        return [row.tobytes() + suffix for row in packed]
+
+    def _store(self, key, value):
+        self._cache[key] = value
+        if (len(self._cache) > self.maxsize):
+            self._cache.popitem(last=False)
+            self.evictions += 1
+
+    def evaluate(self, population):
+        """
+        Avalia uma população de genomas binários, consultando o cache.
+
+        Args:
+            population (2D-array de 0/1):
+                População (N, bits), um genoma por linha.
+
+        Returns:
+            1D-array:
+                Avaliações (N,) na ordem original da população.
+        """
+        population = np.asarray(population)
+        if (population.ndim != 2):
+            raise Exception('A população deve ser um 2D-array (N, bits)!')
+
+        keys = self._keys(population)
+        fitness = np.empty(len(keys), dtype=float)
+
+        #Deduplicação: cada chave inédita é associada à primeira linha em que
+        #aparece e a todas as posições que devem receber o seu resultado.
+        pending = OrderedDict()
+        for i, key in enumerate(keys):
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                fitness[i] = self._cache[key]
+                self.hits += 1
+            elif key in pending:
+                pending[key].append(i)
+                self.hits += 1
+            else:
+                pending[key] = [i]
+                self.misses += 1
+
+        if pending:
+            rows = population[[positions[0] for positions in pending.values()]]
+            if (self.evaluator is None):
+                values = np.array([self.objective(x) for x in rows],
+                                  dtype=float)
+            else:
+                values = np.asarray(self.evaluator(rows),
+                                    dtype=float).reshape(-1)
+            for (key, positions), value in zip(pending.items(), values):
+                fitness[positions] = value
+                self._store(key, value)
+
+        return fitness
+
+    def info(self):
+        """
+        Estatísticas do cache, no formato de "functools.lru_cache".
+
+        Returns:
+            CacheInfo:
+                (hits, misses, evictions, maxsize, currsize).
+        """
+        return CacheInfo(self.hits, self.misses, self.evictions,
+                         self.maxsize, len(self._cache))
+
+    def clear(self):
+        """
+        Esvazia o cache e zera as estatísticas.
+        """
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+
+if (__name__ == '__main__'):
+    from benchmark_functions import bin2int_list, sphere
+
+    cache = BinaryFitnessCache(lambda b: sphere(bin2int_list(list(b), 2)))
+    population = np.random.randint(0, 2, size=(1000, 8))
+    cache.evaluate(population)
+    cache.evaluate(population)
+    print('\n{}'.format(cache.info()))
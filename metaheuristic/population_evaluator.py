@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+# %%
+"""
+Avaliação paralela de populações para funções objetivo custosas.
+
+A população é copiada uma única vez para um bloco de memória compartilhada
+(multiprocessing.shared_memory) e cada processo recebe apenas o nome do bloco
+e o intervalo de linhas (chunk) que deve avaliar, evitando serializar (pickle)
+cada indivíduo. As avaliações são escritas em um segundo bloco compartilhado,
+já na ordem original da população.
+
+Para funções objetivo que liberam o GIL (NumPy, extensões em C, chamadas a
+simuladores externos) é possível utilizar um pool de threads, que dispensa a
+memória compartilhada.
+
+Funções disponíveis:
+    - evaluate_population: Avaliação paralela de uma única população.
+    - PopulationEvaluator: Avaliador reutilizável, mantendo o pool de
+      processos/threads e a memória compartilhada entre gerações.
+"""
+# %%
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+#---------------------------------------
+#Funções internas de avaliação dos chunks
+def _evaluate_rows(objective, population, batched):
+    #Avalia as linhas de "population" de uma só vez (funções que aceitam
+    #populações (N, D)) ou indivíduo a indivíduo.
+    if batched:
+        return np.asarray(objective(population), dtype=float).reshape(-1)
+    return np.array([objective(x) for x in population], dtype=float)
+
+def _shared_chunk(objective, batched, population_name, fitness_name,
+                  shape, dtype, start, stop):
+    #Executado nos processos filhos: acessa os blocos compartilhados, avalia
+    #as linhas [start, stop) e escreve o resultado diretamente na saída.
+    population_shm = shared_memory.SharedMemory(name=population_name)
+    fitness_shm = shared_memory.SharedMemory(name=fitness_name)
+    try:
+        population = np.ndarray(shape, dtype=dtype, buffer=population_shm.buf)
+        fitness = np.ndarray((shape[0],), dtype=float, buffer=fitness_shm.buf)
+        fitness[start:stop] = _evaluate_rows(objective,
+                                             population[start:stop], batched)
+        #Remove as referências aos buffers antes de fechar os blocos.
+        del population, fitness
+    finally:
+        population_shm.close()
+        fitness_shm.close()
+    return start, stop
+#---------------------------------------
+
+
+class PopulationEvaluator:
+    """
+    Avaliador paralelo de populações.
+
+    Mantém o pool de execução aberto entre chamadas, o que é necessário em
+    algoritmos evolutivos onde uma nova população é avaliada a cada geração.
+    Deve ser utilizado como gerenciador de contexto ("with") ou encerrado
+    explicitamente com "close()".
+
+    Args:
+        objective (callable):
+            Função objetivo, como as de "benchmark_functions", recebendo um
+            indivíduo (1D-array) e retornando um escalar. No modo "process" a
+            função deve ser serializável (definida no nível do módulo).
+
+        workers (int, optional): Defaults to None.
+            Número de processos/threads. Caso não seja fornecido, utiliza o
+            número de CPUs disponíveis.
+
+        backend (string, optional): Defaults to 'process'.
+            Valores válidos são:
+                - 'process' -> Pool de processos com memória compartilhada.
+                - 'thread' -> Pool de threads, para funções que liberam o GIL.
+                - 'serial' -> Avaliação no próprio processo (depuração).
+
+        chunk_size (int, optional): Defaults to None.
+            Número de indivíduos por tarefa. Caso não seja fornecido, divide a
+            população em 4 chunks por worker.
+
+        batched (bool, optional): Defaults to False.
+            Indica que a função objetivo aceita uma população (N, D) e retorna
+            um vetor (N,), como as funções de "benchmark_functions". Neste
+            caso cada chunk é avaliado em uma única chamada.
+
+    Exemplo de uso:
+        with PopulationEvaluator(rastrigin, batched=True) as evaluator:
+            for generation in range(100):
+                fitness = evaluator(population)
+                ...
+    """
+    def __init__(self, objective, workers=None, backend='process',
+                 chunk_size=None, batched=False):
+        if (backend not in ('process', 'thread', 'serial')):
+            raise Exception('Invalid backend: {}'.format(backend))
+        self.objective = objective
+        self.workers = workers if workers else (os.cpu_count() or 1)
+        self.backend = backend
+        self.chunk_size = chunk_size
+        self.batched = batched
+        self._executor = None
+        self._population_shm = None
+        self._fitness_shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __call__(self, population):
+        return self.evaluate(population)
+
+    def _chunks(self, length):
+        chunk_size = self.chunk_size
+        if not chunk_size:
+            chunk_size = max(1, -(-length // (4*self.workers)))
+        return [(start, min(start + chunk_size, length))
+                for start in range(0, length, chunk_size)]
+
+    def _get_executor(self):
+        if (self._executor is None):
+            if (self.backend == 'process'):
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _release_shared_memory(self):
+        for shm in (self._population_shm, self._fitness_shm):
+            if (shm is not None):
+                shm.close()
+                shm.unlink()
+        self._population_shm = None
+        self._fitness_shm = None
+
+    def _get_shared_memory(self, nbytes_population, nbytes_fitness):
+        #Reaproveita os blocos enquanto a população couber neles, evitando
+        #alocar memória compartilhada a cada geração.
+        if ((self._population_shm is None)
+                or (self._population_shm.size < nbytes_population)
+                or (self._fitness_shm.size < nbytes_fitness)):
+            self._release_shared_memory()
+            self._population_shm = shared_memory.SharedMemory(
+                create=True, size=max(1, nbytes_population))
+            self._fitness_shm = shared_memory.SharedMemory(
+                create=True, size=max(1, nbytes_fitness))
+        return self._population_shm, self._fitness_shm
+
+    def evaluate(self, population):
+        """
+        Avalia todos os indivíduos da população.
+
+        Args:
+            population (2D-array):
+                População (N, D), um indivíduo por linha.
+
+        Returns:
+            1D-array:
+                Avaliações (N,) na mesma ordem das linhas de "population".
+        """
+        population = np.ascontiguousarray(population)
+        if (population.ndim != 2):
+            raise Exception('A população deve ser um 2D-array (N, D)!')
+        length = population.shape[0]
+        if (length == 0):
+            return np.empty(0, dtype=float)
+
+        if (self.backend == 'serial'):
+            return _evaluate_rows(self.objective, population, self.batched)
+
+        chunks = self._chunks(length)
+        executor = self._get_executor()
+
+        if (self.backend == 'thread'):
+            fitness = np.empty(length, dtype=float)
+            futures = {executor.submit(_evaluate_rows, self.objective,
+                                       population[start:stop], self.batched):
+                       (start, stop) for start, stop in chunks}
+            for future, (start, stop) in futures.items():
+                fitness[start:stop] = future.result()
+            return fitness
+
+        population_shm, fitness_shm = self._get_shared_memory(
+            population.nbytes, length*np.dtype(float).itemsize)
+        shared_population = np.ndarray(population.shape,
+                                        dtype=population.dtype,
+                                        buffer=population_shm.buf)
+        shared_population[:] = population
+        futures = [executor.submit(_shared_chunk, self.objective,
+                                   self.batched, population_shm.name,
+                                   fitness_shm.name, population.shape,
+                                   population.dtype.str, start, stop)
+                   for start, stop in chunks]
+        for future in futures:
+            future.result()
+        fitness = np.ndarray((length,), dtype=float,
+                             buffer=fitness_shm.buf).copy()
+        del shared_population
+        return fitness
+
+    def close(self):
+        """
+        Encerra o pool de execução e libera a memória compartilhada.
+        """
+        if (self._executor is not None):
+            self._executor.shutdown()
+            self._executor = None
+        self._release_shared_memory()
+
+
+def evaluate_population(objective, population, workers=None,
+                        backend='process', chunk_size=None, batched=False):
+    """
+    Avalia uma população em paralelo, retornando as avaliações na ordem
+    original. Para avaliar várias gerações, prefira "PopulationEvaluator",
+    que reaproveita o pool de execução.
+
+    Args:
+        objective (callable):
+            Função objetivo (ver "PopulationEvaluator").
+
+        population (2D-array):
+            População (N, D), um indivíduo por linha.
+
+        workers, backend, chunk_size, batched (optional):
+            Ver "PopulationEvaluator".
+
+    Returns:
+        1D-array:
+            Avaliações (N,) de cada indivíduo.
+    """
+    with PopulationEvaluator(objective, workers=workers, backend=backend,
+                             chunk_size=chunk_size,
+                             batched=batched) as evaluator:
+        return evaluator(population)
+
+
+
+if (__name__ == '__main__'):
+    from benchmark_functions import rastrigin
+
+    population = np.random.uniform(-5.12, 5.12, size=(10000, 10))
+    fitness = evaluate_population(rastrigin, population)
+    print('\nMelhor avaliação: {:0.4f}'.format(np.min(fitness)))
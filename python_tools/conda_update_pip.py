@@ -1,46 +1,224 @@
 # -*- coding: utf-8 -*-
+"""
+Atualiza os pacotes instalados via pip (canal "pypi" no conda) que estejam
+desatualizados.
+
+A lista de pacotes do conda ("conda list --export") é interpretada em
+memória e o pip é consultado uma única vez sobre os pacotes desatualizados
+("pip list --outdated --format=json"). Apenas os pacotes do pypi que estão
+desatualizados são atualizados, em uma única chamada ao pip ou por um número
+limitado de processos paralelos ("--workers"). Caso a chamada única falhe, os
+pacotes são atualizados novamente um a um, identificando quais falharam.
+
+O resultado de cada etapa e de cada pacote (versões, situação e tempo) é
+salvo em "pip_update.log" (separado por TAB). Na chamada única o tempo é o
+total do lote (linha "PIP Update (batch)") e a situação dos pacotes é
+registrada como "OK (batch)".
+
+Os comandos do conda e do pip podem ser substituídos (opções "--conda" e
+"--pip" ou variáveis de ambiente CONDA_COMMAND e PIP_COMMAND), permitindo
+testar o script com comandos locais que simulam o conda e o pip.
+
+Uso:
+    python conda_update_pip.py [--workers N] [--dry-run]
+"""
 import os
+import re
 import csv
+import sys
+import json
 import time
-import numpy as np
+import shlex
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 
-with open('pip_update.log', 'w', newline='') as file:
-    csvwrite = csv.writer(file, delimiter='\t')
-    try:
-        with open('conda_list.log', 'w') as file:
-            for _ in tqdm(range(1), desc='Coletando lista', ascii=True):
-                pack_string = os.popen('conda list --export').read()
-                file.write(pack_string)
-                packages = np.loadtxt('conda_list.log', delimiter='=',\
-                                      comments='#', dtype=object)
+def canonical_name(name):
+    #Normalização dos nomes de pacotes (PEP 503), pois o conda e o pip podem
+    #grafar o mesmo pacote de formas diferentes (ex.: "ruamel_yaml").
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def run_command(command, *args):
+    """
+    Executa um comando (string ou lista) com argumentos adicionais.
+
+    Returns:
+        subprocess.CompletedProcess:
+            Resultado da execução, com stdout e stderr em texto.
+    """
+    if isinstance(command, str):
+        command = shlex.split(command)
+    return subprocess.run(list(command) + list(args), capture_output=True,
+                          text=True)
+
+
+def conda_pypi_packages(conda='conda'):
+    """
+    Pacotes instalados pelo pip segundo "conda list --export".
+
+    Returns:
+        dict:
+            {nome canônico: (nome, versão)} dos pacotes do canal pypi.
+    """
+    result = run_command(conda, 'list', '--export')
+    if (result.returncode != 0):
+        raise Exception(result.stderr.strip() or 'conda list failed!')
+    packages = {}
+    for line in result.stdout.splitlines():
+        line = line.strip()
+        if (not line) or line.startswith('#'):
+            continue
+        fields = line.split('=')
+        if (len(fields) >= 3) and (fields[2] == 'pypi_0'):
+            packages[canonical_name(fields[0])] = (fields[0], fields[1])
+    return packages
+
+
+def pip_outdated(pip='pip'):
+    """
+    Pacotes desatualizados segundo "pip list --outdated --format=json".
+
+    Returns:
+        dict:
+            {nome canônico: (nome, versão instalada, última versão)}.
+    """
+    result = run_command(pip, 'list', '--outdated', '--format=json')
+    if (result.returncode != 0):
+        raise Exception(result.stderr.strip() or 'pip list failed!')
+    return {canonical_name(item['name']):
+            (item['name'], item['version'], item['latest_version'])
+            for item in json.loads(result.stdout or '[]')}
+
 
-        if (len(packages) > 0):
-            log = ['Conda List', 'OK']
-            csvwrite.writerow(log)
-        else:
-            raise Exception()
+def pip_upgrade(names, pip='pip'):
+    """
+    Atualiza os pacotes em uma única chamada ao pip.
 
-    except:
-        log = ['Conda List', 'Error getting list!']
-        csvwrite.writerow(log)
+    Returns:
+        tuple:
+            (sucesso, tempo em segundos, saída do pip)
+    """
+    start = time.perf_counter()
+    result = run_command(pip, 'install', '-U', *names)
+    elapsed = time.perf_counter() - start
+    return (result.returncode == 0), elapsed, \
+        (result.stdout + result.stderr).strip()
 
-    time.sleep(1)
 
+def update(conda='conda', pip='pip', workers=0, dry_run=False,
+           log_file='pip_update.log'):
+    """
+    Atualiza os pacotes do pypi desatualizados, registrando o log.
+
+    Args:
+        conda, pip (string ou lista, optional):
+            Comandos do conda e do pip.
+
+        workers (int, optional): Defaults to 0.
+            0 -> Todos os pacotes em uma única chamada ao pip. Caso ela
+                 falhe, cada pacote é atualizado individualmente.
+            N -> Uma chamada por pacote, com até N chamadas simultâneas.
+
+        dry_run (bool, optional): Defaults to False.
+            Apenas registra os pacotes que seriam atualizados.
+
+        log_file (string, optional): Defaults to 'pip_update.log'.
+            Arquivo de log (separado por TAB).
+
+    Returns:
+        list:
+            Linhas de resultado de cada pacote:
+            [nome, versão instalada, última versão, situação, tempo (s)].
+            O tempo é None nos pacotes atualizados em lote.
+
+    Raises:
+        Exception:
+            Caso não seja possível obter a lista do conda ou do pip (o erro
+            também é registrado no log).
+    """
+    results = []
+    with open(log_file, 'w', newline='') as file:
+        csvwrite = csv.writer(file, delimiter='\t')
+        try:
+            try:
+                packages = conda_pypi_packages(conda)
+                csvwrite.writerow(['Conda List', 'OK', len(packages)])
+            except Exception as error:
+                csvwrite.writerow(['Conda List', 'Error getting list!',
+                                   error])
+                raise
+
+            try:
+                outdated = pip_outdated(pip)
+                csvwrite.writerow(['PIP Outdated', 'OK', len(outdated)])
+            except Exception as error:
+                csvwrite.writerow(['PIP Outdated', 'Error getting list!',
+                                   error])
+                raise
+
+            targets = [outdated[name] for name in sorted(packages)
+                       if name in outdated]
+            if not targets:
+                csvwrite.writerow(['PIP Update', 'No package to update!'])
+            elif dry_run:
+                for name, version, latest in targets:
+                    results.append([name, version, latest, 'Dry run', 0.0])
+            elif (workers <= 0):
+                ok, elapsed, log = pip_upgrade([t[0] for t in targets], pip)
+                print(log)
+                csvwrite.writerow(['PIP Update (batch)',
+                                   'OK' if ok else 'Error',
+                                   '{:0.2f}'.format(elapsed)])
+                for name, version, latest in targets:
+                    if ok:
+                        results.append([name, version, latest, 'OK (batch)',
+                                        None])
+                        continue
+                    #Falha do lote: nova tentativa individual para
+                    #identificar os pacotes com erro.
+                    ok_package, elapsed, log = pip_upgrade([name], pip)
+                    results.append([name, version, latest,
+                                    'OK' if ok_package else 'Error',
+                                    elapsed])
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = [executor.submit(pip_upgrade, [t[0]], pip)
+                               for t in targets]
+                    for (name, version, latest), future in \
+                            tqdm(zip(targets, futures), total=len(targets),
+                                 desc='PIP update', ascii=True):
+                        ok, elapsed, log = future.result()
+                        results.append([name, version, latest,
+                                        'OK' if ok else 'Error', elapsed])
+
+            for row in results:
+                csvwrite.writerow(row[:4] + ['' if (row[4] is None) else
+                                             '{:0.2f}'.format(row[4])])
+        finally:
+            csvwrite.writerow(['Log File', 'Finished'])
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--conda', default=os.environ.get('CONDA_COMMAND',
+                                                          'conda'))
+    parser.add_argument('--pip', default=os.environ.get('PIP_COMMAND', 'pip'))
+    parser.add_argument('--workers', type=int, default=0)
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--log', default='pip_update.log')
+    args = parser.parse_args(argv)
     try:
-        if (len(packages[packages[:,2]=='pypi_0']) < 1):
-            raise Exception()
-        for pack in tqdm(packages[packages[:,2]=='pypi_0'],\
-                          desc='PIP update', ascii=True):
-            log = os.popen('pip install -U ' + pack[0]).read()
-            print(log)
-            csvwrite.writerow([pack[0], log])
-
-    except:
-        log = ['PIP Update', 'No package to update!']
-        csvwrite.writerow(log)
-
-    finally:
-        time.sleep(1)
-        log = ['Log File', 'Finished']
-        csvwrite.writerow(log)
+        results = update(args.conda, args.pip, args.workers, args.dry_run,
+                         args.log)
+    except Exception as error:
+        print(error, file=sys.stderr)
+        return 1
+    return 0 if all(row[3] != 'Error' for row in results) else 1
+
+
+
+if (__name__ == '__main__'):
+    sys.exit(main())
@@ -5,8 +5,14 @@ Funções para análise de covariância entre séries de dados e correlação en
 séries temporais.
 """
 import numpy as np
+import scipy.fft as spfft
+import scipy.signal as spsig
 import scipy.stats as spst
 
+#Número de amostras a partir do qual o modo 'auto' de "correlation" utiliza a
+#FFT (O(N log N)) no lugar da correlação direta.
+FFT_THRESHOLD = 2000
+
 def normalized_covariance(x, y):
     """
     Função utilizada para melhorar a legibilidade dos códigos.
@@ -40,7 +46,52 @@ def normalized_covariance(x, y):
 
 
 
-def correlation(y, u=None, confidence_level=0.95):
+def _lagged_products(y_temp, u_temp, max_lag, method='auto'):
+    """
+    Soma dos produtos atrasados sum_k{y_temp(k+t) * u_temp(k)} para os atrasos
+    t = -max_lag ... max_lag, equivalente ao trecho central de
+    np.correlate(y_temp, u_temp, mode='full').
+
+    Args:
+        y_temp, u_temp (1D-array):
+            Séries temporais já sem a média.
+
+        max_lag (int):
+            Maior atraso calculado.
+
+        method (string, optional): Defaults to 'auto'.
+            'fft', 'direct' ou 'auto' (ver "correlation").
+
+    Returns:
+        1D-array:
+            Vetor com 2*max_lag+1 elementos, do atraso -max_lag ao max_lag.
+    """
+    length = len(y_temp)
+    if (method == 'auto'):
+        method = 'fft' if (length >= FFT_THRESHOLD) else 'direct'
+
+    if (method == 'fft'):
+        #Zero-padding mínimo para que a correlação circular coincida com a
+        #linear em todos os atrasos |t| <= max_lag.
+        n_fft = spfft.next_fast_len(length + max_lag + 1, real=True)
+        spectrum = spfft.rfft(y_temp, n_fft) * np.conj(spfft.rfft(u_temp, n_fft))
+        circular = spfft.irfft(spectrum, n_fft)
+        return np.concatenate((circular[n_fft-max_lag:], circular[:max_lag+1]))
+
+    if (method == 'direct'):
+        if (max_lag == length - 1):
+            return np.correlate(y_temp, u_temp, mode='full')
+        output = np.empty(2*max_lag + 1)
+        for t in range(max_lag + 1):
+            output[max_lag + t] = np.dot(y_temp[t:], u_temp[:length-t])
+            output[max_lag - t] = np.dot(y_temp[:length-t], u_temp[t:])
+        return output
+
+    raise Exception('Método inválido: {}'.format(method))
+
+
+def correlation(y, u=None, confidence_level=0.95, max_lag=None,
+                method='auto'):
     """
     Função de correlação entre as séries temporais "y" e "u" normalizada:
         - Caso y == u -> Autocorrelação
@@ -65,6 +116,16 @@ def correlation(y, u=None, confidence_level=0.95):
         confidence_level (float, optional): Defaults = 0.95
             Coeficiente de confiança de r_yu = 0.
 
+        max_lag (int, optional): Defaults = None
+            Maior atraso (em amostras) calculado e retornado. Caso não seja
+            fornecido, retorna todos os atrasos (len(y)-1).
+
+        method (string, optional): Defaults = 'auto'
+            Método de cálculo da correlação:
+                - 'fft' -> Via transformada rápida de Fourier, O(N log N).
+                - 'direct' -> Soma direta dos produtos, O(N * max_lag).
+                - 'auto' -> 'fft' caso len(y) >= FFT_THRESHOLD, senão 'direct'.
+
     Returns:
         ryu (1D-array):
             Correlação entre "y" e "u".
@@ -83,7 +144,10 @@ def correlation(y, u=None, confidence_level=0.95):
     y = np.array(y)
     u = np.array(u)
 
-    t = np.arange(-1*(len(y)-1), len(y))
+    if (max_lag is None) or (max_lag > len(y)-1):
+        max_lag = len(y)-1
+
+    t = np.arange(-1*max_lag, max_lag+1)
 
     #Correção para usar na função de correlação do numpy.
     y_temp = y - np.mean(y)
@@ -106,7 +170,7 @@ def correlation(y, u=None, confidence_level=0.95):
     #np.correlate(x_temp, y_temp) = sum_k{(x(k) - x_m)*(y(k+t) - y_m)}
     #Assim, np.correlate(x_temp, y_temp)/len(x) = covariância(x(k), y(k+t))
     #Normaliza-se com sqrt(variância(x) * variância(y))
-    ryu = np.correlate(y_temp, u_temp, mode='full') / \
+    ryu = _lagged_products(y_temp, u_temp, max_lag, method) / \
         (np.sqrt(np.var(y)*np.var(u))*len(y))
 
     #Limites = (+ ou -) Z_Score(confianca) / sqrt(N)
@@ -118,6 +182,338 @@ def correlation(y, u=None, confidence_level=0.95):
 
 
 
+def normalized_covariance_matrix(signals):
+    """
+    Versão matricial de "normalized_covariance": coeficientes de correlação
+    de Pearson entre todos os pares de canais, calculados em uma única
+    operação vetorizada.
+
+    Args:
+        signals (2D-list ou 2D-array):
+            Matriz (canais x amostras), um canal por linha.
+
+    Returns:
+        2D-array:
+            Matriz (canais x canais) onde o elemento [i, j] é igual a
+            normalized_covariance(signals[i], signals[j]).
+    """
+    return np.corrcoef(np.asarray(signals, dtype=float))
+
+
+def correlation_matrix(signals, confidence_level=0.95, max_lag=None,
+                       pairs=None):
+    """
+    Correlação entre múltiplos canais (sistemas MIMO), equivalente a chamar
+    correlation(signals[i], signals[j]) para cada par de canais, porém com a
+    remoção da média e a FFT de cada canal calculadas uma única vez.
+
+    Args:
+        signals (2D-list ou 2D-array):
+            Matriz (canais x amostras), um canal por linha.
+
+        confidence_level (float, optional): Defaults = 0.95
+            Coeficiente de confiança de r_yu = 0.
+
+        max_lag (int, optional): Defaults = None
+            Maior atraso (em amostras) calculado. Caso não seja fornecido,
+            utiliza todos os atrasos (amostras-1).
+
+        pairs (list of tuples, optional): Defaults = None
+            Lista de pares (i, j) a serem calculados. Caso não seja fornecida,
+            calcula todos os pares.
+
+    Returns:
+        ryu (3D-array ou 2D-array):
+            Caso "pairs" não seja fornecido, tensor (canais x canais x atrasos)
+            onde ryu[i, j] = correlation(signals[i], signals[j])[0].
+            Caso contrário, matriz (pares x atrasos) na ordem de "pairs".
+            Os pares com i == j (autocorrelação) também são retornados com
+            atrasos negativos, simétricos aos positivos.
+
+        t (1D-array):
+            Vetor de atrasos (tau), de -max_lag a max_lag.
+
+        limit_inferior (float):
+            Limite inferior do intervalo de confiança.
+
+        limit_superior (float):
+            Limite superior do intervalo de confiança.
+    """
+    signals = np.atleast_2d(np.asarray(signals, dtype=float))
+    length = signals.shape[1]
+
+    if (max_lag is None) or (max_lag > length-1):
+        max_lag = length-1
+
+    t = np.arange(-1*max_lag, max_lag+1)
+
+    #Remoção da média, normalização e FFT de cada canal uma única vez.
+    centered = signals - np.mean(signals, axis=1, keepdims=True)
+    scale = np.sqrt(np.var(signals, axis=1) * length)
+    n_fft = spfft.next_fast_len(length + max_lag + 1, real=True)
+    spectra = spfft.rfft(centered, n_fft, axis=1)
+
+    def lagged(i, j):
+        circular = spfft.irfft(spectra[i] * np.conj(spectra[j]), n_fft, axis=-1)
+        return np.concatenate((circular[..., n_fft-max_lag:],
+                               circular[..., :max_lag+1]), axis=-1)
+
+    if (pairs is None):
+        channels = signals.shape[0]
+        ryu = np.empty((channels, channels, len(t)))
+        for i in range(channels):
+            #Cada linha do tensor é calculada em uma única irfft vetorizada.
+            ryu[i] = lagged(i, slice(None)) / (scale[i] * scale[:, None])
+    else:
+        pairs = np.asarray(pairs, dtype=int).reshape(-1, 2)
+        ryu = lagged(pairs[:, 0], pairs[:, 1]) / \
+            (scale[pairs[:, 0]] * scale[pairs[:, 1]])[:, None]
+
+    confidence_interval = np.array(spst.norm.interval(confidence_level)) / np.sqrt(length)
+
+    return ryu, t, confidence_interval[0], confidence_interval[-1]
+
+
+
+
+def validation_tests(e, u, max_lag=20, confidence_level=0.95, test_level=0.99):
+    """
+    Testes de correlação de validação de modelos não-lineares propostos por
+    Billings, aplicados aos resíduos "e" de um modelo com entrada "u":
+        - 'ree'    -> r_ee(t)     = delta(t)
+        - 'rue'    -> r_ue(t)     = 0, para todo t
+        - 'reeu'   -> r_e(eu)(t)  = 0, para t >= 1 (tau = t-1 >= 0)
+        - 'ru2e'   -> r_u²'e(t)   = 0, para todo t
+        - 'ru2e2'  -> r_u²'e²(t)  = 0, para todo t
+
+    Cada teste r_ab é equivalente a correlation(a, b, max_lag=max_lag), onde
+    os sinais derivados são eu = e*u, u² e e² (o "'" indica a remoção da
+    média, já realizada pela correlação). Todos os sinais são transformados
+    uma única vez e os cinco testes são calculados em conjunto por
+    "correlation_matrix".
+
+    Bibliografia:
+        Billings, S.A., 2013. Nonlinear system identification: NARMAX methods
+        in the time, frequency, and spatio-temporal domains. John Wiley & Sons.
+
+    Args:
+        e (1D-list ou 1D-array):
+            Resíduos do modelo.
+
+        u (1D-list ou 1D-array):
+            Sinal de entrada.
+
+        max_lag (int, optional): Defaults = 20
+            Maior atraso (em amostras) avaliado. Com max_lag = 0 os testes
+            'ree' e 'reeu' não têm atrasos a verificar e são aprovados.
+
+        confidence_level (float, optional): Defaults = 0.95
+            Coeficiente de confiança de r = 0.
+
+        test_level (float, optional): Defaults = 0.99
+            Nível de confiança de cada teste. Um teste é aprovado se todos os
+            seus n atrasos ficarem dentro do limite de Bonferroni, de nível
+            1 - (1 - test_level)/n por atraso, mais largo que o intervalo de
+            "confidence_level" retornado para os gráficos. Um modelo correto
+            é rejeitado em cada teste com probabilidade de aproximadamente
+            1 - test_level (com os valores padrão e e, u ruídos brancos
+            independentes, N = 2000: cerca de 1% por teste e 6% em pelo
+            menos um dos cinco), enquanto uma correlação forte em um único
+            atraso ainda reprova o teste.
+
+    Returns:
+        curves (dict):
+            Correlação de cada teste, indexada por 'ree', 'rue', 'reeu',
+            'ru2e' e 'ru2e2', com um elemento por atraso de "t".
+
+        t (1D-array):
+            Vetor de atrasos (tau), de -max_lag a max_lag.
+
+        limit_inferior (float):
+            Limite inferior do intervalo de confiança.
+
+        limit_superior (float):
+            Limite superior do intervalo de confiança.
+
+        passed (dict):
+            Resultado (bool) de cada teste, indexado como "curves".
+    """
+    e = np.asarray(e, dtype=float)
+    u = np.asarray(u, dtype=float)
+
+    #Canais: 0 -> e, 1 -> u, 2 -> e*u, 3 -> u², 4 -> e²
+    signals = np.vstack((e, u, e*u, u**2, e**2))
+    names = ['ree', 'rue', 'reeu', 'ru2e', 'ru2e2']
+    pairs = [(0, 0), (1, 0), (0, 2), (3, 0), (3, 4)]
+    ryu, t, inf, sup = correlation_matrix(signals, confidence_level,
+                                          max_lag, pairs)
+
+    #Atrasos avaliados em cada teste (r_ee é simétrica, de modo que apenas os
+    #atrasos positivos são independentes).
+    regions = {'ree': t >= 1,
+               'rue': np.ones(len(t), dtype=bool),
+               'reeu': t >= 1,
+               'ru2e': np.ones(len(t), dtype=bool),
+               'ru2e2': np.ones(len(t), dtype=bool)}
+
+    curves = {}
+    passed = {}
+    for name, curve in zip(names, ryu):
+        curves[name] = curve
+        tested = curve[regions[name]]
+        #Testes sem atrasos a verificar (ex.: 'ree' com max_lag = 0) são
+        #aprovados.
+        if (len(tested) == 0):
+            passed[name] = True
+            continue
+        bound = spst.norm.ppf(1 - (1 - test_level)/(2*len(tested))) / \
+            np.sqrt(len(e))
+        passed[name] = bool(np.all(np.abs(tested) <= bound))
+
+    return curves, t, inf, sup, passed
+
+
+
+
+class CorrelationAccumulator:
+    """
+    Acumulador incremental da função "correlation" para séries temporais
+    maiores que a memória disponível.
+
+    As amostras de "y" e "u" são fornecidas em blocos (ex.: fatias de um
+    numpy.memmap ou de um gerador) pelo método "update". São mantidas apenas
+    somas acumuladas, as primeiras e as últimas "max_lag" amostras de cada
+    sinal, de modo que o uso de memória depende apenas de "max_lag" e não do
+    tamanho do registro.
+
+    A qualquer momento "result" retorna o mesmo que
+    correlation(y, u, confidence_level, max_lag) aplicada a todas as amostras
+    fornecidas até então. O valor no atraso 0 da correlação cruzada é igual a
+    normalized_covariance(y, u).
+
+    Args:
+        max_lag (int):
+            Maior atraso (em amostras) calculado.
+
+        autocorrelation (bool, optional): Defaults = False
+            Caso True, apenas "y" é fornecido em "update" e o resultado é a
+            autocorrelação de "y".
+
+    Exemplo de uso:
+        acc = CorrelationAccumulator(max_lag=200)
+        for start in range(0, len(y_memmap), 2**20):
+            acc.update(y_memmap[start:start+2**20],
+                       u_memmap[start:start+2**20])
+        ryu, t, inf, sup = acc.result()
+    """
+    def __init__(self, max_lag, autocorrelation=False):
+        self.max_lag = int(max_lag)
+        self.autocorrelation = autocorrelation
+        self.count = 0
+        #Deslocamento (primeira amostra de cada sinal) aplicado antes das
+        #somas para reduzir o erro numérico no cálculo das variâncias.
+        self._shift = None
+        self._sum = np.zeros(2)
+        self._sum_squares = np.zeros(2)
+        #_products[0]: sum_k{y(k+t)*u(k)}, _products[1]: sum_k{y(k)*u(k+t)}
+        self._products = np.zeros((2, self.max_lag + 1))
+        #Primeiras e últimas "max_lag" amostras (y, u), com zeros à esquerda
+        #enquanto não houver amostras suficientes.
+        self._head = np.zeros((2, 0))
+        self._tail = np.zeros((2, self.max_lag))
+
+    def update(self, y, u=None):
+        """
+        Acrescenta um bloco de amostras.
+
+        Args:
+            y (1D-list ou 1D-array):
+                Bloco do sinal 1.
+
+            u (1D-list ou 1D-array, optional):
+                Bloco do sinal 2, com o mesmo tamanho de "y". Não deve ser
+                fornecido no modo de autocorrelação.
+        """
+        y = np.asarray(y, dtype=float).reshape(-1)
+        if self.autocorrelation:
+            u = y
+        elif (u is None):
+            raise Exception('O sinal "u" deve ser fornecido!')
+        else:
+            u = np.asarray(u, dtype=float).reshape(-1)
+        if (len(y) != len(u)):
+            raise Exception('Os blocos "y" e "u" devem ter o mesmo tamanho!')
+        if (len(y) == 0):
+            return
+
+        if (self._shift is None):
+            self._shift = np.array([y[0], u[0]])
+        block = np.vstack((y, u)) - self._shift[:, None]
+
+        self._sum += np.sum(block, axis=1)
+        self._sum_squares += np.sum(block**2, axis=1)
+
+        #Produtos onde a amostra mais recente do par está no novo bloco.
+        extended = np.hstack((self._tail, block))
+        self._products[0] += spsig.correlate(extended[1], block[0],
+                                             mode='valid')[::-1]
+        self._products[1] += spsig.correlate(extended[0], block[1],
+                                             mode='valid')[::-1]
+
+        if (self._head.shape[1] < self.max_lag):
+            missing = self.max_lag - self._head.shape[1]
+            self._head = np.hstack((self._head, block[:, :missing]))
+        self._tail = extended[:, -self.max_lag:] if self.max_lag else \
+            np.zeros((2, 0))
+        self.count += len(y)
+
+    def result(self, confidence_level=0.95):
+        """
+        Correlação normalizada das amostras acumuladas.
+
+        Args:
+            confidence_level (float, optional): Defaults = 0.95
+                Coeficiente de confiança de r_yu = 0.
+
+        Returns:
+            Mesmo retorno de "correlation": (ryu, t, limit_inferior,
+            limit_superior).
+        """
+        n = self.count
+        if (n == 0):
+            raise Exception('Nenhuma amostra foi fornecida!')
+        max_lag = min(self.max_lag, n-1)
+        lags = np.arange(max_lag + 1)
+        mean = self._sum / n
+        variance = self._sum_squares / n - mean**2
+
+        #Somas parciais das bordas: primeiras e últimas "t" amostras.
+        head = np.zeros((2, max_lag + 1))
+        head[:, 1:] = np.cumsum(self._head[:, :max_lag], axis=1)
+        tail = np.zeros((2, max_lag + 1))
+        tail[:, 1:] = np.cumsum(self._tail[:, ::-1][:, :max_lag], axis=1)
+
+        #sum_k{(y(k+t)-ym)*(u(k)-um)}, k = 0 ... n-1-t
+        positive = self._products[0, :max_lag+1] \
+            - mean[0]*(self._sum[1] - tail[1]) \
+            - mean[1]*(self._sum[0] - head[0]) + (n - lags)*mean[0]*mean[1]
+        #sum_k{(y(k)-ym)*(u(k+t)-um)}, k = 0 ... n-1-t
+        negative = self._products[1, :max_lag+1] \
+            - mean[1]*(self._sum[0] - tail[0]) \
+            - mean[0]*(self._sum[1] - head[1]) + (n - lags)*mean[0]*mean[1]
+
+        ryu = np.concatenate((negative[:0:-1], positive)) / \
+            (np.sqrt(variance[0]*variance[1])*n)
+        t = np.arange(-1*max_lag, max_lag+1)
+        t_0 = max_lag if self.autocorrelation else 0
+
+        confidence_interval = np.array(spst.norm.interval(confidence_level)) / np.sqrt(n)
+
+        return ryu[t_0:], t[t_0:], confidence_interval[0], confidence_interval[-1]
+
+
+
+
 if (__name__ == '__main__'):
     import matplotlib.pyplot as plt
 
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+# %%
+"""
+Seleção de estrutura de modelos NARMAX polinomiais pelo algoritmo FROLS
+(Forward Regression Orthogonal Least Squares) com a taxa de redução de erro
+(ERR - Error Reduction Ratio).
+
+A cada passo a taxa ERR de todos os candidatos restantes é calculada em uma
+única operação vetorizada e, após a escolha do melhor termo, os candidatos
+restantes são ortogonalizados em relação a ele (Gram-Schmidt modificado),
+sem reajustar nenhum modelo. Cada passo custa O(amostras x candidatos).
+
+Bibliografia:
+    Billings, S.A., 2013. Nonlinear system identification: NARMAX methods
+    in the time, frequency, and spatio-temporal domains. John Wiley & Sons.
+"""
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+def _column_chunks(count, chunk_size):
+    return [slice(start, min(start + chunk_size, count))
+            for start in range(0, count, chunk_size)]
+
+
+def frols(regressors, y, n_terms=None, rho=1e-3, chunk_size=None, workers=1):
+    """
+    Seleciona os termos de um modelo dentre as colunas de uma matriz de
+    regressores candidatos (ex.: gerada por "narx_regressors").
+
+    Args:
+        regressors (2D-array):
+            Matriz (amostras x candidatos).
+
+        y (1D-list ou 1D-array):
+            Saída correspondente a cada linha de "regressors".
+
+        n_terms (int, optional): Defaults to None.
+            Número de termos a serem selecionados. Caso não seja fornecido, a
+            seleção termina pelo critério "rho".
+
+        rho (float, optional): Defaults to 1e-3.
+            A seleção termina quando 1 - sum(ERR) < rho.
+
+        chunk_size (int, optional): Defaults to None.
+            Número de candidatos processados por bloco. Caso não seja
+            fornecido, todos os candidatos são processados em um único bloco.
+
+        workers (int, optional): Defaults to 1.
+            Número de threads que processam os blocos em paralelo. As
+            operações do NumPy liberam o GIL, de modo que os blocos da matriz
+            de trabalho são atualizados no próprio lugar, sem cópias entre
+            processos.
+
+    Returns:
+        selected (1D-array):
+            Índices das colunas selecionadas, na ordem de seleção.
+
+        theta (1D-array):
+            Parâmetros estimados de cada termo selecionado.
+
+        err (1D-array):
+            Taxa de redução de erro de cada termo selecionado.
+    """
+    work = np.array(regressors, dtype=float, order='F')
+    y = np.asarray(y, dtype=float).reshape(-1)
+    length, count = work.shape
+    if (len(y) != length):
+        raise Exception('"y" deve ter o mesmo número de linhas dos regressores!')
+    if (n_terms is None):
+        n_terms = min(length, count)
+    chunks = _column_chunks(count, chunk_size if chunk_size else count)
+
+    sigma = np.dot(y, y)
+    available = np.ones(count, dtype=bool)
+    numerator = np.empty(count)
+    energy = np.empty(count)
+
+    selected = []
+    err = []
+    g = []
+    #Coeficientes de ortogonalização: A[r, s] = <q_r, p_s> / <q_r, q_r>
+    A = np.zeros((n_terms, count))
+
+    def project(chunk):
+        numerator[chunk] = work[:, chunk].T @ y
+        energy[chunk] = np.einsum('ij,ij->j', work[:, chunk], work[:, chunk])
+
+    def orthogonalize(chunk, q, q_energy, step):
+        coefficients = (q @ work[:, chunk]) / q_energy
+        coefficients[~available[chunk]] = 0
+        A[step, chunk] = coefficients
+        work[:, chunk] -= np.outer(q, coefficients)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        list(executor.map(project, chunks))
+        #Energia original de cada candidato, referência (independente da
+        #escala dos dados) para descartar colunas degeneradas.
+        initial_energy = energy.copy()
+        for step in range(n_terms):
+            if not available.any():
+                break
+            #ERR_j = <w_j, y>² / (<w_j, w_j> <y, y>)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratio = numerator**2 / (energy * sigma)
+            degenerate = energy <= np.finfo(float).eps*length*initial_energy
+            ratio[~available | ~np.isfinite(ratio) | degenerate] = -1
+            best = int(np.argmax(ratio))
+            if (ratio[best] < 0):
+                break
+
+            q = work[:, best].copy()
+            q_energy = energy[best]
+            selected.append(best)
+            err.append(ratio[best])
+            g.append(numerator[best] / q_energy)
+            available[best] = False
+
+            if (1 - np.sum(err) < rho):
+                break
+
+            list(executor.map(lambda c: orthogonalize(c, q, q_energy, step),
+                              chunks))
+            list(executor.map(project, chunks))
+
+    #Recuperação dos parâmetros: A_s * theta = g, com A_s triangular superior
+    #de diagonal unitária formada pelas colunas selecionadas.
+    terms = len(selected)
+    A_selected = A[:terms][:, selected]
+    A_selected[np.tril_indices(terms)] = 0
+    A_selected += np.eye(terms)
+    theta = np.zeros(terms)
+    for r in range(terms-1, -1, -1):
+        theta[r] = g[r] - np.dot(A_selected[r, r+1:], theta[r+1:])
+
+    return np.array(selected, dtype=int), theta, np.array(err)
+
+
+
+if (__name__ == '__main__'):
+    from regressors import narx_regressors
+
+    u = np.random.uniform(-1, 1, 1000)
+    y = np.zeros(1000)
+    for k in range(2, 1000):
+        y[k] = 0.5*y[k-1] + 0.3*u[k-1] - 0.2*y[k-2]*u[k-2] + 0.1*u[k-2]**2
+    y += 0.001*np.random.randn(1000)
+
+    P, labels, _ = narx_regressors(y, u, ny=2, nu=2, degree=2)
+    selected, theta, err = frols(P, y[2:], n_terms=4)
+    for index, parameter, ratio in zip(selected, theta, err):
+        print('{:>16}: {:+0.4f} (ERR = {:0.4f})'.format(labels[index],
+                                                        parameter, ratio))
+
+    #A seleção não depende da escala dos dados (ex.: sinais em µA).
+    scale = 1e-5
+    P_scaled, _, _ = narx_regressors(y*scale, u*scale, ny=2, nu=2, degree=2)
+    selected_scaled, _, _ = frols(P_scaled, y[2:]*scale, n_terms=4)
+    print('\nMesma seleção com os dados em escala {:g}: {}'.format(
+        scale, np.array_equal(selected, selected_scaled)))
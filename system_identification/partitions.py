@@ -1,24 +1,231 @@
 # -*- coding: utf-8 -*-
 # %%
+"""
+Enumeração das combinações de inteiros não negativos ("positions" posições)
+cuja soma resulta de "0" até "value", utilizadas como expoentes dos
+monômios de modelos polinomiais NARX.
+
+Todas as funções seguem a mesma ordem de "partitions": a primeira posição
+varia mais rapidamente e a última posição mais lentamente.
+Ex.: value=2, positions=2 -> [0,0], [1,0], [2,0], [0,1], [1,1], [0,2]
+
+Funções disponíveis:
+    - partitions: Lista de listas (implementação original).
+    - partitions_count: Número de combinações (forma fechada).
+    - iter_partitions: Gerador de tuplas, sem recursão, a partir de qualquer
+      índice (permite dividir a enumeração entre processos).
+    - partitions_rank: Índice de uma combinação na ordem de "partitions".
+    - partitions_unrank: Combinação na posição "index" de "partitions".
+    - partitions_array: 2D-array compacto pré-alocado com todas as combinações.
+"""
+import math as mt
+import numpy as np
+
+def partitions_count(value, positions):
+    """
+    Número de combinações geradas por "partitions", em forma fechada:
+        C(value + positions, positions)
+
+    Args:
+        value (int):
+            Valor máximo da soma de todos os elementos da lista.
+
+        positions (int):
+            Número de elementos de cada lista.
+
+    Returns:
+        int:
+            Número de combinações.
+    """
+    return mt.comb(value + positions, positions)
+
+
+def partitions_rank(combination, value):
+    """
+    Índice (posição) de uma combinação na ordem gerada por "partitions".
+    Inverso de "partitions_unrank".
+
+    Args:
+        combination (list/tuple de int):
+            Combinação, com soma entre 0 e "value".
+
+        value (int):
+            Valor máximo da soma de todos os elementos.
+
+    Returns:
+        int:
+            Índice da combinação em partitions(value, len(combination)).
+    """
+    if (sum(combination) > value) or (min(combination, default=0) < 0):
+        raise Exception('Combinação inválida para value={}!'.format(value))
+    index = 0
+    remaining = value
+    #A última posição varia mais lentamente: todas as combinações com um
+    #valor menor na posição "k" (e as mesmas posições seguintes) vêm antes.
+    #Pela identidade do taco de hóquei, a quantidade dessas combinações é
+    #C(r + k + 1, k + 1) - C(r - a_k + k + 1, k + 1).
+    for k in range(len(combination)-1, -1, -1):
+        a = combination[k]
+        index += mt.comb(remaining + k + 1, k + 1) - \
+            mt.comb(remaining - a + k + 1, k + 1)
+        remaining -= a
+    return index
+
+
+def partitions_unrank(index, value, positions):
+    """
+    Combinação na posição "index" da ordem gerada por "partitions".
+    Inverso de "partitions_rank".
+
+    Args:
+        index (int):
+            Índice da combinação, entre 0 e partitions_count-1.
+
+        value (int):
+            Valor máximo da soma de todos os elementos.
+
+        positions (int):
+            Número de elementos da combinação.
+
+    Returns:
+        tuple:
+            Combinação de inteiros.
+    """
+    if (index < 0) or (index >= partitions_count(value, positions)):
+        raise Exception('Índice fora do intervalo!')
+    combination = [0]*positions
+    remaining = value
+    for k in range(positions-1, -1, -1):
+        total = mt.comb(remaining + k + 1, k + 1)
+        a = 0
+        while (a < remaining) and \
+                (total - mt.comb(remaining - a + k, k + 1) <= index):
+            a += 1
+        index -= total - mt.comb(remaining - a + k + 1, k + 1)
+        combination[k] = a
+        remaining -= a
+    return tuple(combination)
+
+
+def iter_partitions(value, positions, start=0, stop=None):
+    """
+    Gerador, sem recursão, das combinações de "partitions", na mesma ordem.
+    Cada combinação é gerada como uma tupla apenas quando solicitada.
+
+    Os argumentos "start" e "stop" permitem gerar apenas um trecho da
+    enumeração, de modo que cada processo possa gerar a sua parte sem
+    duplicidade e sem comunicação com os demais.
+
+    Args:
+        value (int):
+            Valor máximo da soma de todos os elementos da tupla.
+
+        positions (int):
+            Número de elementos de cada tupla.
+
+        start (int, optional): Defaults to 0.
+            Índice da primeira combinação gerada.
+
+        stop (int, optional): Defaults to None.
+            Índice final (não incluído). Caso não seja fornecido, gera até a
+            última combinação.
+
+    Yields:
+        tuple:
+            Combinação de inteiros com soma entre 0 e "value".
+    """
+    count = partitions_count(value, positions)
+    stop = count if (stop is None) else min(stop, count)
+    if (start >= stop):
+        return
+    current = list(partitions_unrank(start, value, positions))
+    total = sum(current)
+    for _ in range(stop - start):
+        yield tuple(current)
+        #Incremento tipo "odômetro": a primeira posição que puder ser
+        #incrementada sem ultrapassar "value" recebe +1 e as anteriores
+        #voltam a zero.
+        for i in range(positions):
+            if (total < value):
+                current[i] += 1
+                total += 1
+                break
+            total -= current[i]
+            current[i] = 0
+
+
+def partitions_array(value, positions, dtype=None, out=None):
+    """
+    Escreve todas as combinações de "partitions", na mesma ordem, em um
+    2D-array (partitions_count(value, positions) x positions), preenchido
+    coluna a coluna de forma vetorizada.
+
+    Args:
+        value (int):
+            Valor máximo da soma de todos os elementos de cada linha.
+
+        positions (int):
+            Número de colunas.
+
+        dtype (numpy dtype, optional): Defaults to None.
+            Tipo dos elementos. Caso não seja fornecido, utiliza o menor
+            tipo inteiro capaz de representar "value".
+
+        out (2D-array, optional): Defaults to None.
+            Array pré-alocado de saída (ex.: numpy.memmap), com o formato
+            (partitions_count(value, positions), positions).
+
+    Returns:
+        2D-array:
+            Matriz com uma combinação por linha.
+    """
+    count = partitions_count(value, positions)
+    if (out is None):
+        if (dtype is None):
+            dtype = np.min_scalar_type(value)
+        out = np.empty((count, positions), dtype=dtype)
+    elif (out.shape != (count, positions)):
+        raise Exception('O array de saída deve ter o formato {}!'.format(
+            (count, positions)))
+
+    #As colunas são construídas da última (mais lenta) para a primeira.
+    #"sums" contém a soma das colunas já construídas para cada combinação
+    #parcial; cada combinação parcial é expandida com a nova coluna
+    #assumindo os valores 0 ... value-sums.
+    sums = np.zeros(1, dtype=np.int64)
+    for column in range(positions-1, -1, -1):
+        repeats = value - sums + 1
+        starts = np.cumsum(repeats) - repeats
+        new_column = np.arange(np.sum(repeats)) - np.repeat(starts, repeats)
+        sums = np.repeat(sums, repeats) + new_column
+        #Cada combinação parcial se repete uma vez para cada combinação das
+        #"column" colunas restantes cuja soma não ultrapasse o saldo.
+        remaining = value - sums
+        multiplicity = np.array([mt.comb(r + column, column)
+                                 for r in range(value+1)])[remaining]
+        out[:, column] = np.repeat(new_column, multiplicity)
+
+    return out
+
 
 def partitions(value, positions, depth=0):
     """
     Gera uma lista de listas contendo todas as combinações de inteiros, com
     "positions" posições onde a soma dos valores resulta de "0" até "value".
-    
+
     Fonte:
-    Stack Overflow (Nico Schlömer) - 
+    Stack Overflow (Nico Schlömer) -
     https://stackoverflow.com/questions/45348038/variable-number-of-dependent-nested-loops/45348441#45348441
 
     Args:
         value (int):
             Valor máximo da soma de todos os elementos da lista.
-        
+
         positions (int):
             Número de elementos de cada lista.
-        
+
         depth (int, Não utilizar):
-            Variável interna de recursividade, não utilizar.
+            Mantido por compatibilidade, não utilizar.
 
     Returns:
         2D-list:
@@ -26,18 +233,11 @@ def partitions(value, positions, depth=0):
             valores entre 0 e "value".
 
     """
-    if positions == depth:
-        return [[]]
-    return [
-        item + [i]
-        for i in range(value+1)
-        for item in partitions(value-i, positions, depth=depth+1)
-        ]
+    return [list(item) for item in iter_partitions(value, positions-depth)]
 
 
 
 if (__name__ == '__main__'):
-    import numpy as np
     data = partitions(value=3,
                       positions=5)
     print('\nPartition de 3 em 5 posições:\n{}'.format(np.matrix(data)))
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+# %%
+"""
+Construção da matriz de regressores candidatos de modelos NARX polinomiais.
+
+Os monômios candidatos são todas as combinações de expoentes geradas por
+"partitions" sobre os termos atrasados y(k-1)...y(k-ny), u(k-1)...u(k-nu),
+com grau total de 0 (termo constante) até "degree".
+
+Cada potência de cada termo atrasado é calculada uma única vez e as colunas
+são montadas em blocos ("chunk_size" monômios por vez) como o produto de no
+máximo "degree" fatores já calculados.
+"""
+import numpy as np
+from partitions import partitions_array
+
+def lagged_terms(y, u, ny, nu):
+    """
+    Matriz de termos atrasados y(k-1)...y(k-ny), u(k-1)...u(k-nu).
+
+    Args:
+        y (1D-list ou 1D-array):
+            Série temporal de saída.
+
+        u (1D-list/1D-array ou 2D-list/2D-array (entradas x amostras)):
+            Série(s) temporal(is) de entrada. Pode ser None para modelos
+            sem entrada (NAR).
+
+        ny (int):
+            Maior atraso da saída.
+
+        nu (int):
+            Maior atraso de cada entrada.
+
+    Returns:
+        terms (2D-array):
+            Matriz (termos x amostras úteis), onde as amostras úteis são
+            k = max(ny, nu) ... len(y)-1.
+
+        names (string-list):
+            Nome de cada termo, ex.: 'y(k-1)', 'u(k-2)' ou 'u2(k-1)' quando
+            houver mais de uma entrada.
+    """
+    y = np.asarray(y, dtype=float)
+    u = np.zeros((0, len(y))) if (u is None) else \
+        np.atleast_2d(np.asarray(u, dtype=float))
+    if (u.shape[1] != len(y)):
+        raise Exception('Os sinais "y" e "u" devem ter o mesmo tamanho!')
+    if (u.shape[0] == 0):
+        nu = 0
+    max_lag = max(ny, nu)
+    length = len(y) - max_lag
+    if (length <= 0):
+        raise Exception('Número de amostras insuficiente!')
+
+    terms = np.empty((ny + nu*u.shape[0], length))
+    names = []
+    for lag in range(1, ny+1):
+        terms[len(names)] = y[max_lag-lag:len(y)-lag]
+        names.append('y(k-{})'.format(lag))
+    for channel, signal in enumerate(u):
+        prefix = 'u' if (u.shape[0] == 1) else 'u{}'.format(channel+1)
+        for lag in range(1, nu+1):
+            terms[len(names)] = signal[max_lag-lag:len(y)-lag]
+            names.append('{}(k-{})'.format(prefix, lag))
+    return terms, names
+
+
+def _monomial_label(exponents, names):
+    factors = [name if (power == 1) else '{}^{}'.format(name, power)
+               for name, power in zip(names, exponents) if power]
+    return '*'.join(factors) if factors else '1'
+
+
+def narx_regressors(y, u, ny, nu, degree, chunk_size=256, out_file=None):
+    """
+    Matriz de regressores candidatos de um modelo NARX polinomial.
+
+    Args:
+        y (1D-list ou 1D-array):
+            Série temporal de saída.
+
+        u (1D/2D-list ou 1D/2D-array):
+            Série(s) temporal(is) de entrada (ver "lagged_terms").
+
+        ny (int):
+            Maior atraso da saída.
+
+        nu (int):
+            Maior atraso de cada entrada.
+
+        degree (int):
+            Grau máximo de não-linearidade dos monômios. Com degree = 0 o
+            único candidato é o termo constante.
+
+        chunk_size (int, optional): Defaults to 256.
+            Número de colunas (monômios) montadas por vez. Limita a memória
+            temporária a chunk_size * degree * amostras elementos.
+
+        out_file (string, optional): Defaults to None.
+            Caso fornecido, a matriz é escrita em um arquivo ".npy" mapeado
+            em memória (numpy.memmap), permitindo conjuntos de candidatos
+            maiores que a memória disponível.
+
+    Returns:
+        regressors (2D-array):
+            Matriz (amostras úteis x candidatos), armazenada por colunas
+            (Fortran order). A saída correspondente é y[max(ny, nu):].
+
+        labels (string-list):
+            Rótulo de cada candidato, ex.: '1', 'y(k-1)^2*u(k-2)'.
+
+        exponents (2D-array):
+            Expoentes de cada candidato (candidatos x termos atrasados), na
+            ordem de "partitions".
+    """
+    if (degree < 0):
+        raise Exception('O grau deve ser maior ou igual a zero!')
+    terms, names = lagged_terms(y, u, ny, nu)
+    n_terms, length = terms.shape
+    exponents = partitions_array(degree, n_terms)
+    count = exponents.shape[0]
+
+    #Tabela de fatores: linha 0 = 1 (preenchimento), linha 1 + t*degree + p-1
+    #= (termo t)^p. Cada potência é calculada uma única vez.
+    factors = np.empty((1 + n_terms*degree, length))
+    factors[0] = 1
+    for t in range(n_terms if degree else 0):
+        factors[1 + t*degree] = terms[t]
+        for p in range(2, degree+1):
+            factors[t*degree + p] = factors[t*degree + p - 1] * terms[t]
+
+    #Índices dos fatores de cada monômio (no máximo "degree" não nulos).
+    index = np.zeros((count, max(degree, 1)), dtype=np.intp)
+    rows, columns = np.nonzero(exponents)
+    #Posição de cada fator dentro do seu monômio (np.nonzero percorre as
+    #linhas em ordem crescente).
+    position = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    index[rows, position] = 1 + columns*degree + exponents[rows, columns] - 1
+
+    if (out_file is None):
+        regressors = np.empty((length, count), order='F')
+    else:
+        regressors = np.lib.format.open_memmap(out_file, mode='w+',
+                                               dtype=float,
+                                               shape=(length, count),
+                                               fortran_order=True)
+
+    for start in range(0, count, chunk_size):
+        stop = min(start + chunk_size, count)
+        regressors[:, start:stop] = np.prod(factors[index[start:stop]],
+                                            axis=1).T
+
+    labels = [_monomial_label(e, names) for e in exponents]
+    return regressors, labels, exponents
+
+
+
+if (__name__ == '__main__'):
+    u = np.random.randn(200)
+    y = np.zeros(200)
+    for k in range(2, 200):
+        y[k] = 0.5*y[k-1] + 0.3*u[k-1] - 0.1*y[k-2]*u[k-2]
+
+    P, labels, exponents = narx_regressors(y, u, ny=2, nu=2, degree=2)
+    print('\n{} candidatos, {} amostras:\n{}'.format(P.shape[1], P.shape[0],
+                                                     labels))
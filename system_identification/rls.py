@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+# %%
+"""
+Estimador de mínimos quadrados recursivo (RLS - Recursive Least Squares)
+com fator de esquecimento, para identificação online de sistemas.
+
+Os parâmetros e a matriz de covariância são atualizados em O(p²) por amostra
+(p = número de parâmetros), com memória constante. Os resíduos a priori de
+cada atualização podem ser acumulados em um "CorrelationAccumulator", de modo
+que a validação por autocorrelação dos resíduos ("correlation") também seja
+feita em tempo real.
+
+Bibliografia:
+    Aguirre, L.A., 2007. Introdução à Identificação de Sistemas–Técnicas
+    Lineares e Não-Lineares Aplicadas a Sistemas Reais. Editora UFMG.
+"""
+import numpy as np
+import scipy.linalg as spla
+from covariance import CorrelationAccumulator
+
+#Tamanho máximo dos sub-blocos de "update_block" e menor peso relativo
+#(forgetting^tamanho) admitido dentro de um sub-bloco.
+BLOCK_SIZE = 64
+MIN_WEIGHT = 1e-6
+
+class RecursiveLeastSquares:
+    """
+    Estimador de mínimos quadrados recursivo.
+
+    Args:
+        n_parameters (int):
+            Número de parâmetros (regressores) do modelo.
+
+        forgetting (float, optional): Defaults to 1.0.
+            Fator de esquecimento (0 < forgetting <= 1). Valores menores que 1
+            reduzem exponencialmente o peso das amostras antigas.
+
+        delta (float, optional): Defaults to 1e3.
+            Valor inicial da diagonal da matriz de covariância (P = delta*I).
+            Valores altos indicam pouca confiança nos parâmetros iniciais.
+
+        theta (1D-array, optional): Defaults to None.
+            Parâmetros iniciais. Caso não seja fornecido, inicia com zeros.
+
+        max_lag (int, optional): Defaults to None.
+            Caso fornecido, os resíduos a priori são acumulados para o cálculo
+            da autocorrelação dos resíduos até o atraso "max_lag" (ver
+            "residual_correlation").
+
+    Exemplo de uso:
+        rls = RecursiveLeastSquares(3, forgetting=0.99, max_lag=20)
+        for phi, y in stream:
+            rls.update(phi, y)
+        ree, t, inf, sup = rls.residual_correlation()
+    """
+    def __init__(self, n_parameters, forgetting=1.0, delta=1e3, theta=None,
+                 max_lag=None):
+        if not (0 < forgetting <= 1):
+            raise Exception('O fator de esquecimento deve estar em (0, 1]!')
+        self.forgetting = forgetting
+        self.theta = np.zeros(n_parameters) if (theta is None) else \
+            np.array(theta, dtype=float)
+        self.P = delta * np.eye(n_parameters)
+        self.count = 0
+        self.residuals = None if (max_lag is None) else \
+            CorrelationAccumulator(max_lag, autocorrelation=True)
+
+    def predict(self, phi):
+        """
+        Predição um passo à frente: phi @ theta.
+
+        Args:
+            phi (1D-array ou 2D-array):
+                Vetor de regressores ou matriz (amostras x parâmetros).
+        """
+        return np.asarray(phi, dtype=float) @ self.theta
+
+    def update(self, phi, y):
+        """
+        Atualiza os parâmetros com uma única amostra, em O(p²).
+
+        Args:
+            phi (1D-array):
+                Vetor de regressores da amostra.
+
+            y (float):
+                Saída medida.
+
+        Returns:
+            float:
+                Resíduo a priori (y - phi @ theta, antes da atualização).
+        """
+        phi = np.asarray(phi, dtype=float)
+        residual = y - phi @ self.theta
+        P_phi = self.P @ phi
+        gain = P_phi / (self.forgetting + phi @ P_phi)
+        self.theta += gain * residual
+        self.P -= np.outer(gain, P_phi)
+        self.P /= self.forgetting
+        #Mantém a simetria da covariância frente a erros de arredondamento.
+        self.P = (self.P + self.P.T) / 2
+        self.count += 1
+        if (self.residuals is not None):
+            self.residuals.update([residual])
+        return residual
+
+    def update_block(self, Phi, Y):
+        """
+        Atualiza os parâmetros com um bloco de m amostras, equivalente a m
+        chamadas de "update". O bloco é dividido internamente em sub-blocos
+        de no máximo BLOCK_SIZE amostras, limitados também de modo que o peso
+        relativo forgetting^tamanho não seja menor que MIN_WEIGHT (mantendo a
+        matriz de inovação bem condicionada). Pela identidade de Woodbury
+        cada sub-bloco de s amostras custa O(p²s + ps² + s³), com operações
+        matriciais no lugar de s iterações em Python.
+
+        Args:
+            Phi (2D-array):
+                Matriz de regressores (m x p).
+
+            Y (1D-array):
+                Saídas medidas (m,).
+
+        Returns:
+            1D-array:
+                Resíduos a priori de cada amostra do bloco.
+        """
+        Phi = np.atleast_2d(np.asarray(Phi, dtype=float))
+        Y = np.asarray(Y, dtype=float).reshape(-1)
+        m = len(Y)
+        if (m == 0):
+            return np.empty(0)
+
+        size = BLOCK_SIZE
+        if (self.forgetting < 1):
+            size = min(size, int(np.log(MIN_WEIGHT) / np.log(self.forgetting)))
+        size = max(size, 1)
+
+        residuals = np.empty(m)
+        for start in range(0, m, size):
+            stop = min(start + size, m)
+            residuals[start:stop] = self._update_subblock(Phi[start:stop],
+                                                          Y[start:stop])
+        if (self.residuals is not None):
+            self.residuals.update(residuals)
+        return residuals
+
+    def _update_subblock(self, Phi, Y):
+        m = len(Y)
+        #O sub-bloco equivale a um estimador bayesiano com a priori (theta, P)
+        #e variância do ruído da amostra i igual a forgetting^(i+1), sendo a
+        #covariância final P_m = P_posteriori / forgetting^m.
+        noise = self.forgetting ** np.arange(1, m+1)
+        P_PhiT = self.P @ Phi.T
+        innovation = Phi @ P_PhiT + np.diag(noise)
+        initial = Y - Phi @ self.theta
+
+        #Os resíduos a priori sequenciais (iguais aos de "update" amostra a
+        #amostra) são as inovações da fatoração LDL^T da matriz de inovação.
+        cholesky = spla.cholesky(innovation, lower=True)
+        residuals = np.diag(cholesky) * \
+            spla.solve_triangular(cholesky, initial, lower=True)
+
+        gain = spla.cho_solve((cholesky, True), P_PhiT.T).T
+        self.theta += gain @ initial
+        self.P = (self.P - gain @ P_PhiT.T) / self.forgetting**m
+        self.P = (self.P + self.P.T) / 2
+        self.count += m
+        return residuals
+
+    def residual_correlation(self, confidence_level=0.95):
+        """
+        Autocorrelação dos resíduos a priori acumulados, no mesmo formato de
+        "correlation" (ryy, t, limit_inferior, limit_superior).
+        """
+        if (self.residuals is None):
+            raise Exception('O estimador foi criado sem "max_lag"!')
+        return self.residuals.result(confidence_level)
+
+
+
+if (__name__ == '__main__'):
+    rng = np.random.default_rng(0)
+    true_theta = np.array([0.5, -0.2, 0.3])
+    Phi = rng.normal(size=(5000, 3))
+    Y = Phi @ true_theta + 0.01*rng.normal(size=5000)
+
+    rls = RecursiveLeastSquares(3, forgetting=0.999, max_lag=10)
+    for phi, y in zip(Phi, Y):
+        rls.update(phi, y)
+    print('\nParâmetros estimados: {}'.format(rls.theta))
+
+    #Verificação: atualização em bloco equivalente à amostra a amostra.
+    block = RecursiveLeastSquares(3, forgetting=0.999, max_lag=10)
+    block.update_block(Phi, Y)
+    print('Diferença (bloco x amostra a amostra): {:0.2e}'.format(
+        np.max(np.abs(block.theta - rls.theta))))